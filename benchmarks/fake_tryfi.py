@@ -0,0 +1,209 @@
+"""Local stand-in for the TryFi login and GraphQL endpoints.
+
+The server answers the queries sent by custom_components.tryfi.api for a
+configurable number of pets and bases, optionally after a fixed latency. Pet
+positions and step counts move a little on every answer so refreshes exercise
+the diffing and state writes the way a live account does.
+"""
+import asyncio
+
+from aiohttp import web
+
+SESSION_COOKIE = "connect.sid"
+SESSION_ID = "benchmark-session"
+USERNAME = "benchmark@example.com"
+PASSWORD = "benchmark"
+STAT_PERIODS = (("daily", 1), ("weekly", 7), ("monthly", 30))
+LED_COLORS = (
+    (1, "#FF00FF", "Purple"),
+    (2, "#0000FF", "Blue"),
+    (3, "#00FF00", "Green"),
+    (4, "#FFFF00", "Yellow"),
+    (5, "#FFA500", "Orange"),
+    (6, "#FF0000", "Red"),
+    (8, "#FFFFFF", "White"),
+)
+
+
+class FakeTryFi:
+    """aiohttp application serving a synthetic TryFi account."""
+
+    def __init__(self, pets=1, bases=1, latency=0.0):
+        self._pets = pets
+        self._bases = bases
+        self._latency = latency
+        self._tick = 0
+        self._logins = 0
+        self._requests = 0
+
+    @property
+    def pets(self):
+        return self._pets
+
+    @property
+    def bases(self):
+        return self._bases
+
+    @property
+    def logins(self):
+        return self._logins
+
+    @property
+    def requests(self):
+        return self._requests
+
+    def app(self):
+        app = web.Application()
+        app.router.add_post("/auth/login", self.login)
+        app.router.add_get("/graphql", self.graphql)
+        app.router.add_post("/graphql", self.graphql)
+        return app
+
+    async def login(self, request):
+        self._logins += 1
+        data = await request.post()
+        await asyncio.sleep(self._latency)
+        if data.get("email") != USERNAME or data.get("password") != PASSWORD:
+            return web.json_response({"error": {"message": "Invalid credentials"}})
+        response = web.json_response({"userId": "user-1", "sessionId": SESSION_ID})
+        response.set_cookie(SESSION_COOKIE, SESSION_ID)
+        return response
+
+    async def graphql(self, request):
+        if request.cookies.get(SESSION_COOKIE) != SESSION_ID:
+            return web.Response(status=401)
+        if request.method == "GET":
+            query = request.query["query"]
+        else:
+            query = (await request.json())["query"]
+        self._requests += 1
+        self._tick += 1
+        await asyncio.sleep(self._latency)
+        return web.json_response({"data": self.answer(query)})
+
+    def answer(self, query):
+        if query.startswith("mutation"):
+            if "setDeviceLed" in query:
+                return {"setDeviceLed": self.device(0)}
+            return {"updateDeviceOperationParams": self.device(0)}
+        return {
+            "currentUser": {
+                "userHouseholds": [
+                    {
+                        "household": {
+                            "pets": [self.pet(i) for i in range(self._pets)],
+                            "bases": [self.base(i) for i in range(self._bases)],
+                        }
+                    }
+                ]
+            }
+        }
+
+    def device(self, i):
+        return {
+            "__typename": "Device",
+            "id": f"device-{i}",
+            "moduleId": f"module-{i}",
+            "info": {
+                "buildId": "4.11.2",
+                "batteryPercent": 50 + i % 50,
+                "isCharging": False,
+            },
+            "operationParams": {
+                "__typename": "OperationParams",
+                "mode": "NORMAL",
+                "ledEnabled": False,
+                "ledOffAt": None,
+            },
+            "lastConnectionState": {
+                "__typename": "ConnectedToCellular",
+                "date": "2024-01-01T00:00:00Z",
+                "signalStrengthPercent": 80,
+            },
+            "ledColor": {"ledColorCode": 8, "hexCode": "#FFFFFF", "name": "White"},
+            "availableLedColors": [
+                {"ledColorCode": code, "hexCode": hexCode, "name": name}
+                for code, hexCode, name in LED_COLORS
+            ],
+        }
+
+    def activity(self, i):
+        # Odd pets are out on a walk and move on every answer
+        position = {
+            "latitude": 40.0 + i / 1000 + (self._tick * 1e-5 if i % 2 else 0),
+            "longitude": -74.0,
+        }
+        if i % 2:
+            return {
+                "__typename": "OngoingWalk",
+                "areaName": "Park",
+                "start": "2024-01-01T00:00:00Z",
+                "positions": [
+                    {
+                        "date": "2024-01-01T00:00:00Z",
+                        "errorRadius": 10,
+                        "position": position,
+                    }
+                ],
+            }
+        return {
+            "__typename": "OngoingRest",
+            "areaName": "Home",
+            "start": "2024-01-01T00:00:00Z",
+            "position": position,
+            "place": {"name": "Home", "address": "1 Main Street"},
+        }
+
+    def pet(self, i):
+        pet = {
+            "__typename": "Pet",
+            "id": f"pet-{i}",
+            "name": f"Dog {i}",
+            "breed": {"name": "Labrador Retriever"},
+            "photos": {"first": {"image": {"fullSize": f"https://example.com/{i}.jpg"}}},
+            "device": self.device(i),
+            "ongoingActivity": self.activity(i),
+        }
+        for period, days in STAT_PERIODS:
+            pet[f"{period}Stat"] = {
+                "totalSteps": days * 1000 + self._tick,
+                "stepGoal": 5000,
+                "totalDistance": days * 800.0,
+                "dailySteps": [],
+            }
+            pet[f"{period}Rest"] = {
+                "restSummaries": [
+                    {
+                        "data": {
+                            "sleepAmounts": [
+                                {"type": "SLEEP", "duration": days * 36000},
+                                {"type": "NAP", "duration": days * 3600},
+                            ]
+                        }
+                    }
+                ]
+            }
+        return pet
+
+    def base(self, i):
+        return {
+            "__typename": "ChargingBase",
+            "baseId": f"base-{i}",
+            "name": f"Base {i}",
+            "position": {"latitude": 40.0, "longitude": -74.0},
+            "infoLastUpdated": "2024-01-01T00:00:00Z",
+            "networkName": "home-wifi",
+            "online": True,
+            "onlineQuality": "GOOD",
+        }
+
+
+def serve(port, pets=1, bases=1, latency=0.0):
+    """Run the fake API on localhost until the process is terminated."""
+    web.run_app(
+        FakeTryFi(pets, bases, latency).app(),
+        host="127.0.0.1",
+        port=port,
+        print=None,
+        access_log=None,
+    )
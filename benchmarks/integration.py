@@ -0,0 +1,195 @@
+"""End-to-end benchmarks of the integration against a local fake TryFi API.
+
+The fake API (benchmarks/fake_tryfi.py) runs in its own process so the CPU
+time and allocations measured here belong to Home Assistant and the
+integration only. The suite reports:
+
+- setup: async_setup_entry time, cold (login and first refresh) and warm
+  (saved session and cached snapshot restored)
+- refresh: per tier, the latency of a coordinator refresh including the state
+  writes it triggers, its CPU time, the memory it keeps and its peak
+  allocation (tracemalloc)
+- state writes: the cost of writing the state of every entity, per platform
+
+Requires the packages in benchmarks/requirements.txt. Run from the
+repository root:
+
+    python benchmarks/integration.py --pets 10 --bases 2 --latency 50
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import socket
+import statistics
+import sys
+import time
+import tracemalloc
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from homeassistant.helpers import entity_platform  # noqa: E402
+from homeassistant.loader import DATA_CUSTOM_COMPONENTS  # noqa: E402
+from pytest_homeassistant_custom_component.common import (  # noqa: E402
+    MockConfigEntry,
+    async_test_home_assistant,
+    mock_storage,
+)
+
+from custom_components.tryfi import api  # noqa: E402
+from custom_components.tryfi.const import DOMAIN, TIERS  # noqa: E402
+from fake_tryfi import PASSWORD, USERNAME, serve  # noqa: E402
+
+STATE_WRITE_PASSES = 50
+
+
+def freePort():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def async_wait_for_port(port, timeout=10):
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            _, writer = await asyncio.open_connection("127.0.0.1", port)
+        except OSError:
+            if time.monotonic() > deadline:
+                raise
+            await asyncio.sleep(0.05)
+            continue
+        writer.close()
+        await writer.wait_closed()
+        return
+
+
+def percentile(values, percent):
+    if len(values) < 2:
+        return values[0]
+    return statistics.quantiles(values, n=100, method="inclusive")[percent - 1]
+
+
+def ms(seconds):
+    return f"{seconds * 1000:9.2f}"
+
+
+async def async_timed_setup(hass, entry):
+    start = time.perf_counter()
+    assert await hass.config_entries.async_setup(entry.entry_id)
+    await hass.async_block_till_done()
+    return time.perf_counter() - start
+
+
+async def async_bench_setup(hass, entry):
+    cold = await async_timed_setup(hass, entry)
+    assert await hass.config_entries.async_unload(entry.entry_id)
+    warm = await async_timed_setup(hass, entry)
+    print("setup (ms)")
+    print(f"  cold {ms(cold)}")
+    print(f"  warm {ms(warm)}")
+
+
+async def async_bench_refresh(hass, entry, refreshes):
+    tryfiData = hass.data[DOMAIN][entry.entry_id]
+    print(
+        f"refresh, {refreshes} per tier"
+        f"{'':4}{'p50 ms':>9} {'p95 ms':>9} {'cpu ms':>9} {'kept KiB':>10} {'peak KiB':>9}"
+    )
+    for tier in TIERS:
+        coordinator = tryfiData.coordinator(tier)
+        latencies = []
+        cpu = 0.0
+        for _ in range(refreshes):
+            startCpu = time.process_time()
+            start = time.perf_counter()
+            await coordinator.async_refresh()
+            latencies.append(time.perf_counter() - start)
+            cpu += time.process_time() - startCpu
+        assert coordinator.last_update_success, coordinator.last_exception
+
+        # Allocations are traced in a separate pass, tracing skews the timings
+        kept = 0
+        peak = 0
+        tracemalloc.start()
+        for _ in range(refreshes):
+            before, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            await coordinator.async_refresh()
+            after, tracedPeak = tracemalloc.get_traced_memory()
+            kept += max(after - before, 0)
+            peak = max(peak, tracedPeak - before)
+        tracemalloc.stop()
+
+        print(
+            f"  {tier:<26}{ms(percentile(latencies, 50))} {ms(percentile(latencies, 95))}"
+            f" {ms(cpu / refreshes)} {kept / refreshes / 1024:10.1f}"
+            f" {peak / 1024:9.1f}"
+        )
+
+
+def bench_state_writes(hass):
+    print(f"state writes, {STATE_WRITE_PASSES} passes{'':3}{'entities':>9} {'us/write':>9}")
+    for platform in entity_platform.async_get_platforms(hass, DOMAIN):
+        entities = list(platform.entities.values())
+        if not entities:
+            continue
+        start = time.perf_counter()
+        for _ in range(STATE_WRITE_PASSES):
+            for entity in entities:
+                entity.async_write_ha_state()
+        elapsed = time.perf_counter() - start
+        perWrite = elapsed / (STATE_WRITE_PASSES * len(entities)) * 1e6
+        print(f"  {platform.domain:<26}{len(entities):>9} {perWrite:9.1f}")
+
+
+async def async_main(args):
+    port = freePort()
+    server = multiprocessing.Process(
+        target=serve,
+        args=(port, args.pets, args.bases, args.latency / 1000),
+        daemon=True,
+    )
+    server.start()
+    try:
+        await async_wait_for_port(port)
+        base = f"http://127.0.0.1:{port}"
+        with mock_storage(), patch.object(
+            api, "GRAPHQL_URL", f"{base}/graphql"
+        ), patch.object(api, "LOGIN_URL", f"{base}/auth/login"):
+            hass = await async_test_home_assistant(asyncio.get_running_loop())
+            # Load the integration from this checkout
+            hass.data.pop(DATA_CUSTOM_COMPONENTS)
+            entry = MockConfigEntry(
+                domain=DOMAIN,
+                data={"username": USERNAME, "password": PASSWORD, "polling": "10"},
+            )
+            entry.add_to_hass(hass)
+            print(
+                f"{args.pets} pets, {args.bases} bases, "
+                f"{args.latency} ms API latency"
+            )
+            await async_bench_setup(hass, entry)
+            await async_bench_refresh(hass, entry, args.refreshes)
+            bench_state_writes(hass)
+            assert await hass.config_entries.async_unload(entry.entry_id)
+            await hass.async_stop(force=True)
+    finally:
+        server.terminate()
+        server.join()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pets", type=int, default=2)
+    parser.add_argument("--bases", type=int, default=1)
+    parser.add_argument(
+        "--latency", type=float, default=0, help="API response latency in ms"
+    )
+    parser.add_argument("--refreshes", type=int, default=50)
+    asyncio.run(async_main(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""Micro-benchmark of pet lookups during a state-write pass.
+
+Compares the linear getPet scan over the account's pet list with the
+per-refresh TryFiSnapshot, including the cost of building the index once.
+
+Run from the repository root:
+
+    python benchmarks/lookup.py
+"""
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from custom_components.tryfi.models import TryFiSnapshot  # noqa: E402
+
+ENTITIES_PER_PET = 20
+LOOKUPS_PER_WRITE = 12
+PET_COUNTS = (1, 10, 100)
+
+
+class Pet:
+    __slots__ = ("petId",)
+
+    def __init__(self, petId):
+        self.petId = petId
+
+
+def linearGetPet(pets, petId):
+    for pet in pets:
+        if petId == pet.petId:
+            return pet
+    return None
+
+
+def linearPass(pets):
+    for pet in pets:
+        for _ in range(ENTITIES_PER_PET * LOOKUPS_PER_WRITE):
+            linearGetPet(pets, pet.petId)
+
+
+def indexPass(pets):
+    index = TryFiSnapshot(pets, [])
+    for pet in pets:
+        for _ in range(ENTITIES_PER_PET * LOOKUPS_PER_WRITE):
+            index.getPet(pet.petId)
+
+
+def best(func, pets, number):
+    return min(timeit.repeat(lambda: func(pets), number=number, repeat=5)) / number
+
+
+def main():
+    print(f"{'pets':>5} {'linear (ms)':>12} {'index (ms)':>11} {'speed-up':>9}")
+    for count in PET_COUNTS:
+        pets = [Pet(f"pet-{i}") for i in range(count)]
+        number = max(1, 2000 // count)
+        linear = best(linearPass, pets, number) * 1000
+        indexed = best(indexPass, pets, number) * 1000
+        print(f"{count:>5} {linear:>12.3f} {indexed:>11.3f} {linear / indexed:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""Micro-benchmark of matching requested colours to the collar palette.
+
+Compares the Euclidean RGB scan the light used on every colour change with
+TryFiLedPalette, whose lookup table is cold (a new palette) on the first
+pass and warm after it. A pass is a colour-wheel drag of DRAG_COLORS
+random colours.
+
+Run from the repository root:
+
+    python benchmarks/palette.py
+"""
+import math
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from custom_components.tryfi.models import LedColor  # noqa: E402
+from custom_components.tryfi.palette import TryFiLedPalette, hex_to_rgb  # noqa: E402
+
+DRAG_COLORS = 1000
+LED_COLORS = (
+    LedColor(1, "#FF00FF", "Purple"),
+    LedColor(2, "#0000FF", "Blue"),
+    LedColor(3, "#00FF00", "Green"),
+    LedColor(4, "#FFFF00", "Yellow"),
+    LedColor(5, "#FFA500", "Orange"),
+    LedColor(6, "#FF0000", "Red"),
+    LedColor(8, "#FFFFFF", "White"),
+)
+
+
+def scanClosest(target, colors):
+    closest = 8
+    minDistance = float("inf")
+    for code, color in colors.items():
+        distance = math.sqrt(sum((c1 - c2) ** 2 for c1, c2 in zip(target, color)))
+        if distance < minDistance:
+            minDistance = distance
+            closest = code
+    return closest
+
+
+def scanPass(drag):
+    colors = {color.ledColorCode: hex_to_rgb(color.hexCode) for color in LED_COLORS}
+    for rgb in drag:
+        scanClosest(rgb, colors)
+
+
+def palettePass(drag, palette):
+    for rgb in drag:
+        palette.closestCode(rgb)
+
+
+def best(func, number):
+    return min(timeit.repeat(func, number=number, repeat=5)) / number
+
+
+def main():
+    rng = random.Random(0)
+    drag = [tuple(rng.randrange(256) for _ in range(3)) for _ in range(DRAG_COLORS)]
+    scan = best(lambda: scanPass(drag), 20) * 1e6 / DRAG_COLORS
+    cold = best(lambda: palettePass(drag, TryFiLedPalette(LED_COLORS)), 20) * 1e6 / DRAG_COLORS
+    palette = TryFiLedPalette(LED_COLORS)
+    palettePass(drag, palette)
+    warm = best(lambda: palettePass(drag, palette), 20) * 1e6 / DRAG_COLORS
+    print(f"{'match':<22}{'us/colour':>10}")
+    print(f"{'rgb scan':<22}{scan:>10.2f}")
+    print(f"{'lab palette, cold':<22}{cold:>10.2f}")
+    print(f"{'lab palette, warm':<22}{warm:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
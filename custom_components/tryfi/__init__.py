@@ -1,55 +1,236 @@
 import asyncio
 import logging
+import math
+import time
+from dataclasses import replace
 from datetime import timedelta
 
+import aiohttp
+import voluptuous as vol
 from homeassistant import exceptions
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.core import HomeAssistant, callback
+from homeassistant.const import ATTR_ENTITY_ID, EVENT_HOMEASSISTANT_CLOSE
+from homeassistant.core import (
+    HomeAssistant,
+    ServiceCall,
+    ServiceResponse,
+    SupportsResponse,
+    callback,
+)
 from homeassistant.exceptions import ConfigEntryNotReady
 from homeassistant.helpers import config_validation as cv
-from homeassistant.helpers import discovery
-from homeassistant.helpers.dispatcher import async_dispatcher_connect, dispatcher_send
+from homeassistant.helpers.aiohttp_client import async_create_clientsession
+from homeassistant.helpers import device_registry as dr, discovery, event
+from homeassistant.helpers import entity_registry as er
+from homeassistant.helpers.dispatcher import (
+    async_dispatcher_connect,
+    async_dispatcher_send,
+    dispatcher_send,
+)
 from homeassistant.helpers.entity import Entity
 from homeassistant.helpers.event import track_time_interval
+from homeassistant.helpers.storage import Store
 from homeassistant.helpers.update_coordinator import (
     CoordinatorEntity,
     DataUpdateCoordinator,
     UpdateFailed,
 )
-from pytryfi import PyTryFi
+from homeassistant.util import dt as dt_util, slugify
+from pytryfi.const import PET_ACTIVITY_ONGOINGWALK
 
+from .api import TryFiClient, TryFiError
 from .const import (
+    ATTR_END,
+    ATTR_START,
+    BACKOFF_MAX,
+    CONF_JITTER_DISTANCE,
+    CONF_JITTER_INTERVAL,
     CONF_PASSWORD,
+    CONF_POLLING_MAX,
+    CONF_POLLING_MIN,
     CONF_POLLING_RATE,
+    CONF_STAT_PERIODS,
+    CONF_TIER_INTERVALS,
     CONF_USERNAME,
+    CONNECTION_STATE_BASE,
+    DATA_POOL,
+    DEFAULT_JITTER_DISTANCE,
+    DEFAULT_JITTER_INTERVAL,
+    DEFAULT_POLLING_MAX,
+    DEFAULT_POLLING_MIN,
     DEFAULT_POLLING_RATE,
+    DEFAULT_TIER_INTERVALS,
     DOMAIN,
+    HISTORY_IMPORT_INTERVAL,
+    LOST_POLL_INTERVAL,
+    MAX_CONCURRENT_REQUESTS,
+    PLACE_UNKNOWN,
     PLATFORMS,
+    ROLLOVER_DELAY,
+    SENSOR_STATS_BY_TIME,
+    SERVICE_GET_TRACK,
+    SIGNAL_BASES_ADDED,
+    SIGNAL_PETS_ADDED,
+    SNAPSHOT_SAVE_DELAY,
+    STORAGE_KEY_SESSION,
+    STORAGE_KEY_SNAPSHOT,
+    STORAGE_VERSION,
+    TIER_BASES,
+    TIER_DEVICE,
+    TIER_LOCATION,
+    TIER_STATS,
 )
+from .history import TryFiHistoryImporter, historyStore
+from .metrics import TryFiRefreshMetrics
+from .models import TryFiSnapshot, changedFields, dumpSnapshot, loadSnapshot
+from .motion import motionFields, trackedFields
+from .scheduler import backoffDelay
+from .track import TryFiTrack
 
 LOGGER = logging.getLogger(__name__)
 
 
+GET_TRACK_SCHEMA = vol.Schema(
+    {
+        vol.Required(ATTR_ENTITY_ID): cv.entity_ids,
+        vol.Optional(ATTR_START): cv.datetime,
+        vol.Optional(ATTR_END): cv.datetime,
+    }
+)
+
+
 async def async_setup(hass: HomeAssistant, config: dict):
     hass.data.setdefault(DOMAIN, {})
+
+    async def async_get_track(call: ServiceCall) -> ServiceResponse:
+        start = call.data.get(ATTR_START)
+        end = call.data.get(ATTR_END)
+        return {
+            "tracks": {
+                entityId: [
+                    {
+                        "time": dt_util.utc_from_timestamp(timestamp).isoformat(),
+                        "latitude": latitude,
+                        "longitude": longitude,
+                        "accuracy": accuracy,
+                    }
+                    for timestamp, latitude, longitude, accuracy in track.window(
+                        None if start is None else dt_util.as_utc(start).timestamp(),
+                        None if end is None else dt_util.as_utc(end).timestamp(),
+                    )
+                ]
+                for entityId, track in petTracks(hass, call.data[ATTR_ENTITY_ID])
+            }
+        }
+
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_GET_TRACK,
+        async_get_track,
+        schema=GET_TRACK_SCHEMA,
+        supports_response=SupportsResponse.ONLY,
+    )
     return True
 
 
+@callback
+def petTracks(hass, entityIds):
+    """Yield the entity id and track of the pet each entity belongs to."""
+    entities = er.async_get(hass)
+    devices = dr.async_get(hass)
+    for entityId in entityIds:
+        entity = entities.async_get(entityId)
+        device = None
+        if entity is not None and entity.device_id is not None:
+            device = devices.async_get(entity.device_id)
+        tryfiData = None
+        if entity is not None:
+            tryfiData = hass.data[DOMAIN].get(entity.config_entry_id)
+        if device is None or not isinstance(tryfiData, TryFiData):
+            raise exceptions.HomeAssistantError(
+                f"{entityId} is not a loaded TryFi pet entity"
+            )
+        coordinator = tryfiData.coordinator(TIER_LOCATION)
+        track = None
+        for domain, identifier in device.identifiers:
+            if domain == DOMAIN:
+                track = coordinator.track(identifier)
+        if track is None:
+            raise exceptions.HomeAssistantError(f"{entityId} has no GPS fixes yet")
+        yield entityId, track
+
+
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
-    tryfi = await hass.async_add_executor_job(PyTryFi,entry.data["username"], entry.data["password"])
-    hass.data[DOMAIN][entry.entry_id] = tryfi
+    pool = async_get_pool(hass)
+    tryfi = TryFiClient(
+        pool.session,
+        entry.data["username"],
+        entry.data["password"],
+        sessionStore(hass, entry.data["username"]),
+        pool.semaphore,
+    )
 
-    # Exceptions are swallowed in the PyTryFi library, so we must assert a 
-    # sucessful login before continuing with setup. When not successful,
-    # hass will continue to retry setup
-    if not hasattr(tryfi, 'currentUser'):
-        raise ConfigEntryNotReady
+    tryfi.setStatPeriods(statPeriods(entry))
 
-    coordinator = TryFiDataUpdateCoordinator(hass, tryfi, int(entry.data["polling"]))
-    await coordinator.async_config_entry_first_refresh()
+    cache = TryFiSnapshotCache(hass, entry.entry_id, tryfi)
+    intervals = tierIntervals(entry)
+    coordinators = {
+        tier: TryFiDataUpdateCoordinator(hass, tryfi, tier, intervals[tier], cache)
+        for tier in (TIER_DEVICE, TIER_BASES)
+    }
+    coordinators[TIER_STATS] = TryFiStatsCoordinator(
+        hass, tryfi, intervals[TIER_STATS], cache
+    )
+    coordinators[TIER_LOCATION] = TryFiLocationCoordinator(
+        hass, tryfi, *locationPolling(entry), *jitterFilter(entry), cache
+    )
+
+    # Reuse the session saved by the last login; if it has expired the first
+    # request logs in again.
+    sessionRestored = await tryfi.async_restore_session()
+
+    if await cache.async_restore():
+        # Entities start from the cached snapshot, marked stale, and the live
+        # refresh runs in the background so TryFi cannot hold up the boot.
+        snapshot = TryFiSnapshot(tryfi.pets, tryfi.bases, stale=True)
+        for coordinator in coordinators.values():
+            coordinator.async_set_updated_data(snapshot)
+        entry.async_create_background_task(
+            hass,
+            async_refresh_tiers(coordinators),
+            f"{DOMAIN} {entry.entry_id} first refresh",
+        )
+    else:
+        # When the login is not successful, hass will continue to retry setup
+        if not sessionRestored:
+            try:
+                await tryfi.async_login()
+            except TryFiError as err:
+                raise ConfigEntryNotReady from err
+        await async_refresh_tiers(coordinators, firstRefresh=True)
+
+    # Days missed while Home Assistant was down are imported on start
+    history = TryFiHistoryImporter(hass, entry.entry_id, tryfi)
+    entry.async_on_unload(
+        event.async_track_time_interval(
+            hass, history.async_import, timedelta(seconds=HISTORY_IMPORT_INTERVAL)
+        )
+    )
+    entry.async_create_background_task(
+        hass, history.async_import(), f"{DOMAIN} {entry.entry_id} history import"
+    )
+
+    # Pets and bases joining or leaving the household after this point are
+    # added or removed without a reload
+    household = TryFiHousehold(hass, entry, tryfi, coordinators)
+    for tier in (TIER_DEVICE, TIER_BASES):
+        entry.async_on_unload(
+            coordinators[tier].async_add_listener(household.async_update)
+        )
 
     hass.data.setdefault(DOMAIN, {})
-    hass.data[DOMAIN][entry.entry_id] = coordinator
+    hass.data[DOMAIN][entry.entry_id] = TryFiData(tryfi, coordinators, cache, history)
+    entry.async_on_unload(entry.add_update_listener(async_update_options))
 
     # This creates each HA object for each platform your device requires.
     # It's done by calling the `async_setup_entry` function in each platform module.
@@ -58,6 +239,75 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     return True
 
 
+def tierIntervals(entry):
+    """Return the refresh interval of the device, stats and bases tiers."""
+    return {
+        tier: int(entry.options.get(CONF_TIER_INTERVALS[tier], interval))
+        for tier, interval in DEFAULT_TIER_INTERVALS.items()
+    }
+
+
+def locationPolling(entry):
+    """Return the polling rate, floor and ceiling of the location tier."""
+    return (
+        int(entry.options.get(CONF_POLLING_RATE, entry.data[CONF_POLLING_RATE])),
+        int(entry.options.get(CONF_POLLING_MIN, DEFAULT_POLLING_MIN)),
+        int(entry.options.get(CONF_POLLING_MAX, DEFAULT_POLLING_MAX)),
+    )
+
+
+def jitterFilter(entry):
+    """Return the minimum distance and interval of the tracker's jitter filter."""
+    return (
+        float(entry.options.get(CONF_JITTER_DISTANCE, DEFAULT_JITTER_DISTANCE)),
+        float(entry.options.get(CONF_JITTER_INTERVAL, DEFAULT_JITTER_INTERVAL)),
+    )
+
+
+def statPeriods(entry):
+    return [
+        period.lower()
+        for period in entry.options.get(CONF_STAT_PERIODS, SENSOR_STATS_BY_TIME)
+    ]
+
+
+async def async_update_options(hass: HomeAssistant, entry: ConfigEntry):
+    """Apply changed options to the running coordinators, without a reload."""
+    tryfiData = hass.data[DOMAIN][entry.entry_id]
+    for tier, interval in tierIntervals(entry).items():
+        tryfiData.coordinator(tier).setPollingRate(interval)
+    location = tryfiData.coordinator(TIER_LOCATION)
+    location.setPolling(*locationPolling(entry))
+    location.setJitterFilter(*jitterFilter(entry))
+    if tryfiData.tryfi.setStatPeriods(statPeriods(entry)):
+        # Fetch the added windows and clear the dropped ones right away
+        await tryfiData.coordinator(TIER_STATS).async_refresh()
+
+
+async def async_refresh_tiers(coordinators, firstRefresh=False):
+    """Refresh every tier, starting with the one that discovers the pets."""
+    # The device tier discovers the pets, so it must complete before the
+    # location and stats tiers have anything to refresh.
+    if firstRefresh:
+        await coordinators[TIER_DEVICE].async_config_entry_first_refresh()
+        await asyncio.gather(
+            *(
+                coordinator.async_config_entry_first_refresh()
+                for tier, coordinator in coordinators.items()
+                if tier != TIER_DEVICE
+            )
+        )
+        return
+    await coordinators[TIER_DEVICE].async_refresh()
+    await asyncio.gather(
+        *(
+            coordinator.async_refresh()
+            for tier, coordinator in coordinators.items()
+            if tier != TIER_DEVICE
+        )
+    )
+
+
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry):
     """Unload a config entry."""
     # This is called when an entry/configured device is to be removed. The class
@@ -72,11 +322,44 @@ async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry):
         )
     )
     if unload_ok:
-        hass.data[DOMAIN].pop(entry.entry_id)
+        tryfiData = hass.data[DOMAIN].pop(entry.entry_id)
+        # Write the pending snapshot now, before the entry can be removed
+        await tryfiData.cache.async_save()
 
     return unload_ok
 
 
+async def async_remove_entry(hass: HomeAssistant, entry: ConfigEntry):
+    """Forget the saved session, snapshot and history import of a removed entry."""
+    await sessionStore(hass, entry.data["username"]).async_remove()
+    await snapshotStore(hass, entry.entry_id).async_remove()
+    await historyStore(hass, entry.entry_id).async_remove()
+
+
+@callback
+def async_get_pool(hass):
+    """Return the TryFiPool shared by every config entry."""
+    domainData = hass.data.setdefault(DOMAIN, {})
+    if DATA_POOL not in domainData:
+        domainData[DATA_POOL] = TryFiPool(hass)
+    return domainData[DATA_POOL]
+
+
+def sessionStore(hass, username):
+    """Return the Store holding the login session of an account."""
+    return Store(
+        hass,
+        STORAGE_VERSION,
+        f"{STORAGE_KEY_SESSION}.{slugify(username)}",
+        private=True,
+    )
+
+
+def snapshotStore(hass, entryId):
+    """Return the Store holding the last snapshot of a config entry."""
+    return Store(hass, STORAGE_VERSION, f"{STORAGE_KEY_SNAPSHOT}.{entryId}")
+
+
 async def async_connect_or_timeout(hass, tryfi):
     userId = None
     try:
@@ -92,17 +375,230 @@ class CannotConnect(exceptions.HomeAssistantError):
     """Error to indicate we cannot connect."""
 
 
+GOLDEN_RATIO_CONJUGATE = (math.sqrt(5) - 1) / 2
+
+
+class TryFiPool:
+    """Resources shared by every TryFi config entry.
+
+    All accounts send their requests through one aiohttp session on HA's
+    shared connector, so they reuse the same keep-alive connections and DNS
+    cache, and through one semaphore that caps the requests in flight for the
+    whole domain. Cookies are tracked per account by the clients, so the
+    session itself must not keep any.
+
+    Coordinators draw their refresh phase here as well: consecutive values of
+    the golden ratio sequence spread any number of them evenly over their
+    interval.
+    """
+
+    def __init__(self, hass):
+        # The session outlives the entry that happens to create it, so it is
+        # only released when HA closes.
+        self._session = async_create_clientsession(
+            hass, auto_cleanup=False, cookie_jar=aiohttp.DummyCookieJar()
+        )
+        hass.bus.async_listen_once(EVENT_HOMEASSISTANT_CLOSE, self._async_close)
+        self._semaphore = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+        self._coordinators = 0
+
+    @property
+    def session(self):
+        return self._session
+
+    @property
+    def semaphore(self):
+        return self._semaphore
+
+    @callback
+    def _async_close(self, _event):
+        self._session.detach()
+
+    def nextPhase(self):
+        """Return the fraction of its interval a new coordinator refreshes at."""
+        phase = (self._coordinators * GOLDEN_RATIO_CONJUGATE) % 1
+        self._coordinators += 1
+        return phase
+
+
+class TryFiData:
+    """Runtime data of a config entry: the client and its tier coordinators."""
+
+    def __init__(self, tryfi, coordinators, cache, history):
+        self._tryfi = tryfi
+        self._coordinators = coordinators
+        self._cache = cache
+        self._history = history
+
+    @property
+    def tryfi(self):
+        return self._tryfi
+
+    @property
+    def coordinators(self):
+        return self._coordinators
+
+    @property
+    def cache(self):
+        return self._cache
+
+    @property
+    def history(self):
+        return self._history
+
+    def coordinator(self, tier):
+        return self._coordinators[tier]
+
+
+class TryFiSnapshotCache:
+    """Last good pets and bases of an entry, kept on disk across restarts."""
+
+    def __init__(self, hass, entryId, tryfi):
+        self._store = snapshotStore(hass, entryId)
+        self._tryfi = tryfi
+
+    async def async_restore(self):
+        """Load the cached snapshot into the client, if there is one."""
+        data = await self._store.async_load()
+        if not data:
+            return False
+        try:
+            pets, bases = loadSnapshot(data)
+        except (KeyError, TypeError, ValueError) as err:
+            LOGGER.warning(f"Ignoring unreadable TryFi snapshot cache: {err}")
+            return False
+        self._tryfi.restoreSnapshot(pets, bases)
+        return True
+
+    async def async_save(self):
+        """Save the client's pets and bases right away."""
+        if self._tryfi.pets or self._tryfi.bases:
+            await self._store.async_save(self._data())
+
+    @callback
+    def async_schedule_save(self):
+        """Save the client's pets and bases once the save delay has passed."""
+        self._store.async_delay_save(self._data, SNAPSHOT_SAVE_DELAY)
+
+    def _data(self):
+        return dumpSnapshot(self._tryfi.pets, self._tryfi.bases)
+
+
+class TryFiHousehold:
+    """Keeps the devices and entities in step with the pets and bases of the
+    account.
+
+    After every refresh of the device and bases tiers the pet and base IDs
+    are compared with the known ones. New ones are announced over the
+    dispatcher, so each platform creates only their entities. Removed ones
+    lose their device, which takes their entities with it.
+    """
+
+    def __init__(self, hass, entry, tryfi, coordinators):
+        self._hass = hass
+        self._entry = entry
+        self._tryfi = tryfi
+        self._coordinators = coordinators
+        self._petIds = {pet.petId for pet in tryfi.pets}
+        self._baseIds = {base.baseId for base in tryfi.bases}
+
+    @callback
+    def async_update(self):
+        pets = {pet.petId: pet for pet in self._tryfi.pets}
+        bases = {base.baseId: base for base in self._tryfi.bases}
+        addedPets = [pets[petId] for petId in pets.keys() - self._petIds]
+        addedBases = [bases[baseId] for baseId in bases.keys() - self._baseIds]
+        removed = (self._petIds - pets.keys()) | (self._baseIds - bases.keys())
+        self._petIds = set(pets)
+        self._baseIds = set(bases)
+
+        if addedPets:
+            LOGGER.info(f"New TryFi pets: {', '.join(pet.name for pet in addedPets)}")
+            # Every tier has to know the new pets before their entities read
+            # them, the location and stats tiers then fetch their data
+            for coordinator in self._coordinators.values():
+                coordinator.async_publish(reschedule=False)
+            async_dispatcher_send(
+                self._hass, SIGNAL_PETS_ADDED.format(self._entry.entry_id), addedPets
+            )
+            for tier in (TIER_LOCATION, TIER_STATS):
+                self._hass.async_create_task(
+                    self._coordinators[tier].async_request_refresh()
+                )
+        if addedBases:
+            LOGGER.info(
+                f"New TryFi bases: {', '.join(base.name for base in addedBases)}"
+            )
+            async_dispatcher_send(
+                self._hass, SIGNAL_BASES_ADDED.format(self._entry.entry_id), addedBases
+            )
+        if removed:
+            self._async_remove_devices(removed)
+
+    @callback
+    def _async_remove_devices(self, identifiers):
+        devices = dr.async_get(self._hass)
+        for identifier in identifiers:
+            LOGGER.info(f"TryFi {identifier} left the household, removing it")
+            self._coordinators[TIER_LOCATION].forget(identifier)
+            device = devices.async_get_device(identifiers={(DOMAIN, identifier)})
+            if device is not None:
+                devices.async_update_device(
+                    device.id, remove_config_entry_id=self._entry.entry_id
+                )
+
+
+@callback
+def async_track_household(hass, entry, petsAdded, basesAdded=None):
+    """Call petsAdded and basesAdded with the current pets and bases of the
+    account, then again with every one it gains until the entry unloads."""
+    tryfi = hass.data[DOMAIN][entry.entry_id].tryfi
+    petsAdded(tryfi.pets)
+    entry.async_on_unload(
+        async_dispatcher_connect(
+            hass, SIGNAL_PETS_ADDED.format(entry.entry_id), petsAdded
+        )
+    )
+    if basesAdded is None:
+        return
+    basesAdded(tryfi.bases)
+    entry.async_on_unload(
+        async_dispatcher_connect(
+            hass, SIGNAL_BASES_ADDED.format(entry.entry_id), basesAdded
+        )
+    )
+
+
+def fieldContext(key, *fields):
+    """Return the listener context for an entity reading fields of a pet or base."""
+    return frozenset((key, field) for field in fields)
+
+
 class TryFiDataUpdateCoordinator(DataUpdateCoordinator):
-    """Class to manage the refresh of the tryfi data api"""
+    """Class to manage the refresh of one tier of the tryfi data api
 
-    def __init__(self, hass, tryfi, pollingRate):
+    Each refresh publishes a new TryFiSnapshot as the coordinator data, so
+    entities resolve their pet or base by id. Entities register with a
+    context built by fieldContext(). After a successful refresh only the
+    listeners whose fields changed are called; failures, recoveries and
+    manual updates still reach every listener.
+    """
+
+    def __init__(self, hass, tryfi, tier, pollingRate, cache=None):
         self._tryfi = tryfi
+        self._cache = cache
+        self._metrics = TryFiRefreshMetrics()
+        self._phase = async_get_pool(hass).nextPhase()
         self._hass = hass
+        self._tier = tier
         self._pollingRate = int(pollingRate)
+        self._changedFields = None
+        self._notifiedSuccess = True
+        self._metricsListeners = []
         super().__init__(
             hass,
             LOGGER,
-            name=DOMAIN,
+            name=f"{DOMAIN} {tier}",
             update_interval=timedelta(seconds=pollingRate),
         )
 
@@ -110,15 +606,425 @@ class TryFiDataUpdateCoordinator(DataUpdateCoordinator):
     def tryfi(self):
         return self._tryfi
 
+    @property
+    def tier(self):
+        return self._tier
+
     @property
     def pollingRate(self):
         return self._pollingRate
 
+    @property
+    def metrics(self):
+        return self._metrics
+
+    @callback
+    def async_add_metrics_listener(self, update_callback):
+        """Listen for the failed refreshes that follow a failed one.
+
+        The coordinator does not notify its listeners of those, but the
+        metrics still change.
+        """
+        self._metricsListeners.append(update_callback)
+
+        @callback
+        def remove_listener():
+            self._metricsListeners.remove(update_callback)
+
+        return remove_listener
+
+    @callback
+    def setPollingRate(self, pollingRate):
+        """Change the regular interval and move the next refresh to it.
+
+        A tier backing off after failures keeps its longer interval until it
+        recovers.
+        """
+        self._pollingRate = int(pollingRate)
+        if self._metrics.consecutiveFailures:
+            return
+        self.update_interval = timedelta(seconds=self._pollingRate)
+        if self._listeners:
+            self._schedule_refresh()
+
     async def _async_update_data(self):
         """Update data via library."""
+        start = time.perf_counter()
         try:
-            await self._hass.async_add_executor_job(self.tryfi.update)
+            stats = await self.tryfi.async_update_tier(self.tier)
         except Exception as error:
-            LOGGER.error("Error updating TryFi data\n{error}")
+            self._metrics.recordFailure(time.perf_counter() - start, dt_util.utcnow())
+            retryIn = self._backOff()
+            # The coordinator logs the first failure of a streak as an error
+            LOGGER.debug(
+                f"Error updating TryFi {self.tier} data, retrying in {retryIn:.0f} seconds: {error}"
+            )
+            if not self.last_update_success:
+                for update_callback in list(self._metricsListeners):
+                    update_callback()
             raise UpdateFailed(error) from error
-        return self.tryfi
+        self._metrics.recordSuccess(
+            time.perf_counter() - start, stats, dt_util.utcnow()
+        )
+        self.update_interval = timedelta(seconds=self.pollingRate)
+        if self._cache is not None:
+            self._cache.async_schedule_save()
+        return self._snapshot()
+
+    @property
+    def phase(self):
+        return self._phase
+
+    @callback
+    def _schedule_refresh(self):
+        """Schedule the next refresh on this coordinator's phase of its interval.
+
+        Refreshes land on loop times congruent to phase * interval, so the
+        coordinators of every entry keep their offsets from each other instead
+        of firing on the same tick. The next one is the grid point closest to
+        a full interval from now, and never before the circuit breaker would
+        let the request through.
+        """
+        if self.update_interval is None:
+            return
+        if self.config_entry and self.config_entry.pref_disable_polling:
+            return
+        self._async_unsub_refresh()
+
+        interval = self.update_interval.total_seconds()
+        offset = self._phase * interval
+        now = self.hass.loop.time()
+        earliest = now + max(interval / 2, self.tryfi.breaker.retryIn)
+        nextRefresh = math.ceil((earliest - offset) / interval) * interval + offset
+        self._unsub_refresh = event.async_call_at(self.hass, self._job, nextRefresh)
+
+    def _backOff(self):
+        """Stretch the interval after a failure and return the new one.
+
+        The interval grows exponentially with the tier's consecutive failures
+        and never ends before the circuit breaker lets a request through.
+        """
+        retryIn = max(
+            backoffDelay(
+                self._metrics.consecutiveFailures,
+                self.pollingRate,
+                max(BACKOFF_MAX, self.pollingRate),
+            ),
+            self.tryfi.breaker.retryIn,
+        )
+        self.update_interval = timedelta(seconds=retryIn)
+        return retryIn
+
+    def _snapshot(self):
+        snapshot = TryFiSnapshot(
+            self.tryfi.pets,
+            self.tryfi.bases,
+            failing=self.tryfi.failingUnits(self.tier),
+        )
+        if self.data is None or self.data.stale:
+            # Every entity has to drop its stale marker
+            self._changedFields = None
+        else:
+            self._changedFields = changedFields(self.data, snapshot)
+        return snapshot
+
+    @callback
+    def async_publish(self, reschedule=True):
+        """Publish the client's current state after a command changed it.
+
+        Unless reschedule is set, the next regular refresh keeps its time.
+        """
+        if reschedule:
+            self.async_set_updated_data(self._snapshot())
+            return
+        self.data = self._snapshot()
+        self.async_update_listeners()
+
+    @callback
+    def async_update_listeners(self):
+        changed, self._changedFields = self._changedFields, None
+        availabilityChanged = self.last_update_success != self._notifiedSuccess
+        self._notifiedSuccess = self.last_update_success
+        if changed is None or availabilityChanged:
+            super().async_update_listeners()
+            return
+        for update_callback, context in list(self._listeners.values()):
+            if context is None or not changed.isdisjoint(context):
+                update_callback()
+
+
+class TryFiLocationCoordinator(TryFiDataUpdateCoordinator):
+    """Location tier whose interval follows what the pets are doing.
+
+    After each refresh every pet votes for an interval and the shortest one
+    wins: the floor while a pet is walking or away from its place, the
+    ceiling while its collar sits on the base, and an interval that doubles
+    from the configured polling rate towards the ceiling while it rests at a
+    known place.
+
+    A lost pet is tracked apart from the others: a burst loop refreshes its
+    location alone every LOST_POLL_INTERVAL seconds, without the stats and
+    bases tiers, until it is back to safe.
+    """
+
+    def __init__(
+        self,
+        hass,
+        tryfi,
+        pollingRate,
+        pollingMin,
+        pollingMax,
+        jitterDistance=0,
+        jitterInterval=0,
+        cache=None,
+    ):
+        self._pollingMin = int(pollingMin)
+        self._pollingMax = max(int(pollingMax), self._pollingMin)
+        self._jitterDistance = float(jitterDistance)
+        self._jitterInterval = float(jitterInterval)
+        self._places = {}
+        self._restIntervals = {}
+        self._tracks = {}
+        self._bursts = {}
+        super().__init__(
+            hass,
+            tryfi,
+            TIER_LOCATION,
+            min(max(int(pollingRate), self._pollingMin), self._pollingMax),
+            cache,
+        )
+
+    @property
+    def pollingMin(self):
+        return self._pollingMin
+
+    @property
+    def pollingMax(self):
+        return self._pollingMax
+
+    @callback
+    def setPolling(self, pollingRate, pollingMin, pollingMax):
+        """Change the polling rate and its bounds, the adaptive interval starts
+        over from the new rate."""
+        self._pollingMin = int(pollingMin)
+        self._pollingMax = max(int(pollingMax), self._pollingMin)
+        self._restIntervals.clear()
+        self.setPollingRate(
+            min(max(int(pollingRate), self._pollingMin), self._pollingMax)
+        )
+
+    @callback
+    def setJitterFilter(self, jitterDistance, jitterInterval):
+        self._jitterDistance = float(jitterDistance)
+        self._jitterInterval = float(jitterInterval)
+
+    @property
+    def jitterDistance(self):
+        return self._jitterDistance
+
+    @property
+    def jitterInterval(self):
+        return self._jitterInterval
+
+    def track(self, petId):
+        return self._tracks.get(petId)
+
+    @callback
+    def forget(self, petId):
+        """Drop what is kept about a pet that left the household."""
+        self._tracks.pop(petId, None)
+        self._places.pop(petId, None)
+        self._restIntervals.pop(petId, None)
+        self.async_sync_bursts()
+
+    async def _async_update_data(self):
+        snapshot = await super()._async_update_data()
+        interval = min(
+            (self._petInterval(pet) for pet in snapshot.pets.values()),
+            default=self.pollingMax,
+        )
+        if interval != self.update_interval.total_seconds():
+            LOGGER.debug(f"Polling TryFi locations every {interval} seconds")
+        self.update_interval = timedelta(seconds=interval)
+        # Lost mode may have been switched from the TryFi app
+        self.async_sync_bursts()
+        return snapshot
+
+    @callback
+    def async_sync_bursts(self):
+        """Start the burst loop of every lost pet and stop the others."""
+        lost = {pet.petId for pet in self.tryfi.pets if pet.isLost}
+        for petId, task in list(self._bursts.items()):
+            if task.done():
+                del self._bursts[petId]
+        for petId in self._bursts.keys() - lost:
+            LOGGER.debug(f"Stopping the lost mode tracking of {petId}")
+            self._bursts.pop(petId).cancel()
+        if self.config_entry is None:
+            return
+        for petId in lost - self._bursts.keys():
+            LOGGER.debug(f"Starting the lost mode tracking of {petId}")
+            self._bursts[petId] = self.config_entry.async_create_background_task(
+                self.hass,
+                self._async_burst(petId),
+                f"{DOMAIN} {self.config_entry.entry_id} lost {petId}",
+            )
+
+    async def _async_burst(self, petId):
+        while True:
+            try:
+                await self.tryfi.async_update_pet_location(petId)
+            except TryFiError as err:
+                LOGGER.debug(f"Unable to refresh the location of lost pet {petId}: {err}")
+            except Exception as err:  # pylint: disable=broad-except
+                LOGGER.exception(f"Unexpected error refreshing lost pet {petId}: {err}")
+            else:
+                # The regular refresh of the other pets is not pushed back
+                self.async_publish(reschedule=False)
+            await asyncio.sleep(max(LOST_POLL_INTERVAL, self.tryfi.breaker.retryIn))
+
+    @callback
+    def _cancelBursts(self):
+        for task in self._bursts.values():
+            task.cancel()
+        self._bursts.clear()
+
+    async def async_shutdown(self):
+        await super().async_shutdown()
+        self._cancelBursts()
+
+    def _snapshot(self):
+        """Record the new fixes and derive the motion of every pet in one pass
+        before publishing."""
+        now = dt_util.utcnow()
+        home = None
+        if self.hass.config.latitude is not None:
+            home = (self.hass.config.latitude, self.hass.config.longitude)
+        # A walk that has not moved for two polls is standing still
+        staleAfter = 2 * self.update_interval.total_seconds()
+        updates = {}
+        for pet in self.tryfi.pets:
+            if pet.currLatitude is None or pet.currLongitude is None:
+                continue
+            track = self._tracks.get(pet.petId)
+            if track is None:
+                track = self._tracks[pet.petId] = TryFiTrack()
+            lastFix = track.last()
+            fixTime = (pet.currFixTime or now).timestamp()
+            if not track.append(
+                fixTime, pet.currLatitude, pet.currLongitude, pet.currAccuracy
+            ):
+                lastFix = None
+            tracked = trackedFields(
+                pet, fixTime, self.jitterDistance, self.jitterInterval
+            )
+            if tracked:
+                pet = replace(pet, **tracked)
+            previous = None if self.data is None else self.data.getPet(pet.petId)
+            updates[pet.petId] = {
+                **tracked,
+                **motionFields(
+                    pet, previous, lastFix, fixTime, home, now, staleAfter
+                ),
+            }
+        self.tryfi.updateDerived(updates)
+        return super()._snapshot()
+
+    def _petInterval(self, pet):
+        place = pet.currPlaceName
+        previousPlace = self._places.get(pet.petId, place)
+        self._places[pet.petId] = place
+
+        if (
+            pet.activityType == PET_ACTIVITY_ONGOINGWALK
+            or place == PLACE_UNKNOWN
+            or place != previousPlace
+        ):
+            self._restIntervals.pop(pet.petId, None)
+            return self.pollingMin
+        if pet.connectionStateType == CONNECTION_STATE_BASE:
+            return self.pollingMax
+
+        # Resting at a known place: back off a little more on every refresh.
+        interval = self._restIntervals.get(pet.petId, self.pollingRate / 2) * 2
+        interval = min(interval, self.pollingMax)
+        self._restIntervals[pet.petId] = interval
+        return interval
+
+
+class TryFiStatsCoordinator(TryFiDataUpdateCoordinator):
+    """Stats tier refreshed right after its windows roll over.
+
+    The daily, weekly and monthly totals restart when their window ends, in
+    the account's timezone. Besides its slow regular interval the tier
+    refreshes ROLLOVER_DELAY seconds after the next window end reported by
+    TryFi, or after local midnight while no end is known. A failed rollover
+    refresh is retried after a delay that starts at ROLLOVER_DELAY and
+    doubles up to the regular interval.
+    """
+
+    def __init__(self, hass, tryfi, pollingRate, cache=None):
+        self._nextRollover = None
+        self._unsubRollover = None
+        self._rolloverFailures = 0
+        super().__init__(hass, tryfi, TIER_STATS, pollingRate, cache)
+
+    @property
+    def nextRollover(self):
+        return self._nextRollover
+
+    async def _async_update_data(self):
+        snapshot = await super()._async_update_data()
+        self._scheduleRollover()
+        return snapshot
+
+    @callback
+    def _scheduleRollover(self):
+        self._cancelRollover()
+        self._rolloverFailures = 0
+        now = dt_util.utcnow()
+        rollover = self.tryfi.nextStatsRollover(now)
+        if rollover is None:
+            rollover = dt_util.start_of_local_day(
+                dt_util.as_local(now).date() + timedelta(days=1)
+            )
+        self._nextRollover = rollover
+        self._unsubRollover = event.async_track_point_in_utc_time(
+            self.hass,
+            self._async_rollover,
+            rollover + timedelta(seconds=ROLLOVER_DELAY),
+        )
+
+    async def _async_rollover(self, _now):
+        self._cancelRollover()
+        LOGGER.debug(f"TryFi stats window ended at {self._nextRollover}, refreshing")
+        await self.async_refresh()
+        if self.last_update_success or self._unsubRollover is not None:
+            return
+        # The totals still belong to the window that ended
+        self._rolloverFailures += 1
+        retryIn = max(
+            backoffDelay(self._rolloverFailures, ROLLOVER_DELAY, self.pollingRate),
+            self.tryfi.breaker.retryIn,
+        )
+        LOGGER.debug(
+            f"TryFi stats rollover refresh failed, retrying in {retryIn:.0f} seconds"
+        )
+        self._unsubRollover = event.async_call_later(
+            self.hass, retryIn, self._async_rollover
+        )
+
+    @callback
+    def _cancelRollover(self):
+        if self._unsubRollover is not None:
+            self._unsubRollover()
+            self._unsubRollover = None
+
+    @callback
+    def _unschedule_refresh(self):
+        super()._unschedule_refresh()
+        self._cancelRollover()
+
+    async def async_shutdown(self):
+        await super().async_shutdown()
+        self._cancelRollover()
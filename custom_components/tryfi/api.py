@@ -0,0 +1,911 @@
+"""Async client for the TryFi API."""
+import asyncio
+import contextvars
+import datetime
+import functools
+import logging
+import time
+from dataclasses import dataclass, replace
+
+import aiohttp
+from homeassistant import exceptions
+from homeassistant.util.json import json_loads
+from pytryfi.const import (
+    API_GRAPHQL,
+    API_HOST_URL_BASE,
+    API_LOGIN,
+    FRAGEMENT_BASE_PET_PROFILE,
+    FRAGMENT_ACTIVITY_SUMMARY_DETAILS,
+    FRAGMENT_BASE_DETAILS,
+    FRAGMENT_BREED_DETAILS,
+    FRAGMENT_CIRCLE_DETAILS,
+    FRAGMENT_CONNECTION_STATE_DETAILS,
+    FRAGMENT_DEVICE_DETAILS,
+    FRAGMENT_LED_DETAILS,
+    FRAGMENT_LOCATION_POINT,
+    FRAGMENT_ONGOING_ACTIVITY_DETAILS,
+    FRAGMENT_OPERATIONAL_DETAILS,
+    FRAGMENT_PET_PROFILE,
+    FRAGMENT_PHOTO_DETAILS,
+    FRAGMENT_PLACE_DETAILS,
+    FRAGMENT_POSITION_COORDINATES,
+    FRAGMENT_REST_SUMMARY_DETAILS,
+    FRAGMENT_UNCERTAINTY_DETAILS,
+    FRAGMENT_USER_DETAILS,
+    MUTATION_DEVICE_OPS,
+    MUTATION_SET_LED_COLOR,
+    PET_ACTIVITY_ONGOINGWALK,
+    PET_MODE_LOST,
+    PET_MODE_NORMAL,
+    QUERY_PET_DEVICE_DETAILS,
+    VAR_PET_ID,
+)
+
+from .const import (
+    HISTORY_DAYS,
+    MAX_CONCURRENT_REQUESTS,
+    PLACE_UNKNOWN,
+    REQUEST_TIMEOUT,
+    TIER_BASES,
+    TIER_DEVICE,
+    TIER_LOCATION,
+    TIER_STATS,
+    TIERS,
+)
+from .models import BaseSnapshot, LedColor, PetSnapshot
+from .scheduler import TryFiCircuitBreaker, TryFiUnitBackoff, parseRetryAfter
+
+LOGGER = logging.getLogger(__name__)
+
+
+@dataclass(slots=True)
+class RequestStats:
+    """Requests made by one tier refresh.
+
+    networkTime covers sending the requests and reading the responses,
+    parseTime the rest of the refresh: decoding the JSON and building the
+    snapshots.
+    """
+
+    calls: int = 0
+    bytesReceived: int = 0
+    networkTime: float = 0.0
+    parseTime: float = 0.0
+
+
+# Stats of the tier refresh the current task is running, if any
+_requestStats = contextvars.ContextVar("tryfi_request_stats", default=None)
+
+GRAPHQL_URL = API_HOST_URL_BASE + API_GRAPHQL
+LOGIN_URL = API_HOST_URL_BASE + API_LOGIN
+
+STAT_PERIODS = ("daily", "weekly", "monthly")
+
+
+def _householdQuery(selection):
+    return (
+        "query {  currentUser {    userHouseholds {      household {"
+        + selection
+        + "      }    }  }}"
+    )
+
+
+# Query documents are assembled from the fragments shipped with pytryfi. Each
+# refresh tier sends a single query that selects its part of every pet (or
+# base) in the account, so the number of round trips does not grow with the
+# number of pets. A pet whose part of the answer is unusable is fetched on its
+# own with the single-pet variant of the query.
+PET_PROFILE_FRAGMENTS = (
+    FRAGMENT_PET_PROFILE
+    + FRAGEMENT_BASE_PET_PROFILE
+    + FRAGMENT_BREED_DETAILS
+    + FRAGMENT_PHOTO_DETAILS
+    + FRAGMENT_DEVICE_DETAILS
+    + FRAGMENT_LED_DETAILS
+    + FRAGMENT_OPERATIONAL_DETAILS
+    + FRAGMENT_CONNECTION_STATE_DETAILS
+    + FRAGMENT_USER_DETAILS
+)
+QUERY_PETS = (
+    _householdQuery("        pets {          ...PetProfile        }")
+    + PET_PROFILE_FRAGMENTS
+)
+QUERY_PET_PROFILE = QUERY_PET_DEVICE_DETAILS + PET_PROFILE_FRAGMENTS
+QUERY_BASES = (
+    _householdQuery("        bases {          ...BaseDetails        }")
+    + FRAGMENT_BASE_DETAILS
+    + FRAGMENT_POSITION_COORDINATES
+)
+# The location tier also carries the collar's connection state so the
+# "Connected To" sensor refreshes at the same rate as the tracker.
+LOCATION_SELECTION = (
+    "          ongoingActivity {            __typename            ...OngoingActivityDetails          }"
+    "          device {            __typename            lastConnectionState {"
+    "              __typename              ...ConnectionStateDetails            }          }"
+)
+LOCATION_FRAGMENTS = (
+    FRAGMENT_ONGOING_ACTIVITY_DETAILS
+    + FRAGMENT_UNCERTAINTY_DETAILS
+    + FRAGMENT_CIRCLE_DETAILS
+    + FRAGMENT_LOCATION_POINT
+    + FRAGMENT_PLACE_DETAILS
+    + FRAGMENT_USER_DETAILS
+    + FRAGMENT_POSITION_COORDINATES
+    + FRAGMENT_CONNECTION_STATE_DETAILS
+)
+QUERY_LOCATION = (
+    _householdQuery("        pets {          id" + LOCATION_SELECTION + "        }")
+    + LOCATION_FRAGMENTS
+)
+# The same selection for a single pet, used while it is lost
+QUERY_PET_LOCATION = (
+    'query {  pet (id: "' + VAR_PET_ID + '") {    id' + LOCATION_SELECTION + "  }}"
+    + LOCATION_FRAGMENTS
+)
+
+
+def _statsSelection(periods):
+    return "".join(
+        f"          {period}Stat: currentActivitySummary (period: {period.upper()}) {{"
+        "            ...ActivitySummaryDetails          }"
+        f"          {period}Rest: restSummaryFeed (cursor: null, period: {period.upper()}, limit: 1) {{"
+        "            __typename            restSummaries {"
+        "              __typename              ...RestSummaryDetails            }          }"
+        for period in periods
+    )
+
+
+@functools.lru_cache(maxsize=None)
+def statsQuery(periods):
+    """Return the query of the activity and rest summaries of the given
+    windows, aliased per period."""
+    return (
+        _householdQuery("        pets {          id" + _statsSelection(periods) + "        }")
+        + FRAGMENT_ACTIVITY_SUMMARY_DETAILS
+        + FRAGMENT_REST_SUMMARY_DETAILS
+    )
+
+
+@functools.lru_cache(maxsize=None)
+def petStatsQuery(periods):
+    """Return statsQuery() for a single pet."""
+    return (
+        'query {  pet (id: "' + VAR_PET_ID + '") {    id' + _statsSelection(periods) + "  }}"
+        + FRAGMENT_ACTIVITY_SUMMARY_DETAILS
+        + FRAGMENT_REST_SUMMARY_DETAILS
+    )
+
+
+QUERY_STATS = statsQuery(STAT_PERIODS)
+# Daily steps of the current week and month and the most recent daily rest
+# summaries, the history the backfill of long-term statistics is built from.
+# TryFi only serves the current windows, the week carries the last days of the
+# previous month over a month rollover
+QUERY_HISTORY = (
+    _householdQuery(
+        "        pets {          id"
+        "          weeklyStat: currentActivitySummary (period: WEEKLY) {"
+        "            ...ActivitySummaryDetails          }"
+        "          monthlyStat: currentActivitySummary (period: MONTHLY) {"
+        "            ...ActivitySummaryDetails          }"
+        f"          dailyRest: restSummaryFeed (cursor: null, period: DAILY, limit: {HISTORY_DAYS}) {{"
+        "            __typename            restSummaries {"
+        "              __typename              ...RestSummaryDetails            }          }"
+        "        }"
+    )
+    + FRAGMENT_ACTIVITY_SUMMARY_DETAILS
+    + FRAGMENT_REST_SUMMARY_DETAILS
+)
+# Switches the light on and sets its colour in one round trip, the fields of a
+# mutation run in order
+MUTATION_SET_LIGHT = (
+    "mutation SetLight($input: UpdateDeviceOperationParamsInput!, $moduleId: String!, $ledColorCode: Int!) {"
+    "  updateDeviceOperationParams(input: $input) {    __typename    ...DeviceDetails  }"
+    "  setDeviceLed(moduleId: $moduleId, ledColorCode: $ledColorCode) {    __typename    ...DeviceDetails  }}"
+)
+MUTATION_FRAGMENTS = (
+    FRAGMENT_DEVICE_DETAILS
+    + FRAGMENT_OPERATIONAL_DETAILS
+    + FRAGMENT_CONNECTION_STATE_DETAILS
+    + FRAGMENT_USER_DETAILS
+    + FRAGMENT_LED_DETAILS
+)
+
+
+def _parseDate(value):
+    if value is None:
+        return None
+    return datetime.datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+
+
+def parseConnectionState(connectionJSON):
+    """Return the PetSnapshot fields held in a ConnectionStateDetails payload."""
+    return {
+        "connectionStateType": connectionJSON["__typename"],
+        "connectionStateDate": _parseDate(connectionJSON.get("date")),
+    }
+
+
+def parseDevice(deviceJSON):
+    """Return the PetSnapshot fields held in a DeviceDetails payload."""
+    info = deviceJSON.get("info") or {}
+    operationParams = deviceJSON["operationParams"]
+    ledOffAt = _parseDate(operationParams.get("ledOffAt"))
+    return {
+        "moduleId": deviceJSON["moduleId"],
+        "buildId": info.get("buildId"),
+        "batteryPercent": int(info["batteryPercent"]),
+        # V1 of the collar reports charging, V2 does not
+        "isCharging": bool(info.get("isCharging", False)),
+        # TryFi keeps ledEnabled set after the light times out at ledOffAt
+        "ledOn": bool(operationParams["ledEnabled"])
+        and ledOffAt is not None
+        and ledOffAt > datetime.datetime.now(datetime.timezone.utc),
+        "ledColorHex": (deviceJSON.get("ledColor") or {}).get("hexCode"),
+        "availableLedColors": tuple(
+            LedColor(int(color["ledColorCode"]), color["hexCode"], color["name"])
+            for color in deviceJSON.get("availableLedColors") or ()
+        ),
+        "mode": operationParams["mode"],
+        **parseConnectionState(deviceJSON["lastConnectionState"]),
+    }
+
+
+def parsePet(petJSON):
+    """Return the PetSnapshot fields held in a PetProfile payload."""
+    try:
+        photoLink = petJSON["photos"]["first"]["image"]["fullSize"]
+    except (KeyError, TypeError):
+        photoLink = ""
+    return {
+        "name": petJSON.get("name") or "Unknown Pet Name",
+        "breed": (petJSON.get("breed") or {}).get("name") or "Dog",
+        "photoLink": photoLink,
+        **parseDevice(petJSON["device"]),
+    }
+
+
+def parseLocation(activityJSON):
+    """Return the PetSnapshot fields held in an OngoingActivityDetails payload,
+    None when it holds no position yet."""
+    activityType = activityJSON["__typename"]
+    positions = activityJSON.get("positions") or ()
+    if activityType == PET_ACTIVITY_ONGOINGWALK and positions:
+        point = positions[-1]
+        position = point["position"]
+        accuracy = point.get("errorRadius")
+        fixTime = point.get("date")
+    else:
+        # A walk that has just started may not have a position of its own yet
+        position = activityJSON.get("position")
+        if position is None:
+            return None
+        circle = (activityJSON.get("uncertaintyInfo") or {}).get("circle") or {}
+        accuracy = circle.get("radius")
+        fixTime = activityJSON.get("lastReportTimestamp")
+    place = activityJSON.get("place") or {}
+    return {
+        "activityType": activityType,
+        "areaName": activityJSON.get("areaName"),
+        "currLatitude": float(position["latitude"]),
+        "currLongitude": float(position["longitude"]),
+        "currAccuracy": None if accuracy is None else float(accuracy),
+        "currFixTime": _parseDate(fixTime),
+        "currStartTime": _parseDate(activityJSON.get("start")),
+        "currPlaceName": place.get("name") or PLACE_UNKNOWN,
+        "currPlaceAddress": place.get("address") or PLACE_UNKNOWN,
+    }
+
+
+def parsePetLocation(petJSON):
+    """Return the location and connection fields of a pet in the location
+    tier's answer, None when it reports no activity."""
+    # Pets without a collar have no activity to report
+    if petJSON.get("ongoingActivity") is None:
+        return None
+    return {
+        **(parseLocation(petJSON["ongoingActivity"]) or {}),
+        **parseConnectionState(petJSON["device"]["lastConnectionState"]),
+    }
+
+
+def parseStats(petJSON, periods=STAT_PERIODS):
+    """Return the PetSnapshot fields held in a pet's activity and rest summaries.
+
+    The fields of the windows left out of periods are cleared.
+    """
+    stats = {}
+    for period in STAT_PERIODS:
+        if period not in periods:
+            for suffix in ("Steps", "TotalDistance", "Sleep", "Nap"):
+                stats[f"{period}{suffix}"] = None
+            continue
+        summary = petJSON[f"{period}Stat"]
+        # distance is in metres, sleep and nap durations in seconds
+        stats[f"{period}Steps"] = int(summary["totalSteps"])
+        stats[f"{period}TotalDistance"] = float(summary["totalDistance"])
+        stats[f"{period}Sleep"] = 0
+        stats[f"{period}Nap"] = 0
+        # Older collars have no rest summaries
+        summaries = (petJSON.get(f"{period}Rest") or {}).get("restSummaries") or ()
+        for summary in summaries[:1]:
+            for sleepAmount in (summary.get("data") or {}).get("sleepAmounts") or ():
+                if sleepAmount["type"] == "SLEEP":
+                    stats[f"{period}Sleep"] = int(sleepAmount["duration"])
+                elif sleepAmount["type"] == "NAP":
+                    stats[f"{period}Nap"] = int(sleepAmount["duration"])
+    return stats
+
+
+def parseStatsWindowEnds(petJSON):
+    """Return when the daily, weekly and monthly windows of a pet's stats end."""
+    ends = []
+    for period in STAT_PERIODS:
+        end = _parseDate((petJSON.get(f"{period}Stat") or {}).get("end"))
+        if end is not None and end.tzinfo is not None:
+            ends.append(end)
+    return ends
+
+
+def parseHistory(petJSON):
+    """Return the daily steps, sleep and nap of a pet as (date, value) pairs.
+
+    Dates are the parsed start of each day as TryFi reports it, the days of the
+    weekly and monthly summaries merged, sleep and nap durations are in seconds.
+    """
+    history = {"steps": [], "sleep": [], "nap": []}
+    steps = {}
+    for window in ("weeklyStat", "monthlyStat"):
+        for day in (petJSON.get(window) or {}).get("dailySteps") or ():
+            if day.get("date"):
+                steps[_parseDate(day["date"])] = int(day["totalSteps"])
+    history["steps"] = sorted(steps.items())
+    summaries = (petJSON.get("dailyRest") or {}).get("restSummaries") or ()
+    for summary in summaries:
+        amounts = {"SLEEP": 0, "NAP": 0}
+        for sleepAmount in (summary.get("data") or {}).get("sleepAmounts") or ():
+            if sleepAmount["type"] in amounts:
+                amounts[sleepAmount["type"]] = int(sleepAmount["duration"])
+        start = _parseDate(summary["start"])
+        if start is None:
+            continue
+        history["sleep"].append((start, amounts["SLEEP"]))
+        history["nap"].append((start, amounts["NAP"]))
+    return history
+
+
+def _decode(body):
+    try:
+        return json_loads(body)
+    except ValueError as err:
+        raise TryFiError(f"Invalid response from TryFi: {err}") from err
+
+
+def householdItems(data, key):
+    """Yield the pets or bases of every household in a currentUser payload.
+
+    Parts TryFi could not resolve come back null and are skipped.
+    """
+    for house in (data.get("currentUser") or {}).get("userHouseholds") or ():
+        for item in ((house or {}).get("household") or {}).get(key) or ():
+            if item:
+                yield item
+
+
+def householdIndex(data, key, idKey="id"):
+    """Return the pets or bases of a currentUser payload by ID."""
+    return {
+        item[idKey]: item
+        for item in householdItems(data, key)
+        if item.get(idKey) is not None
+    }
+
+
+def parseBase(baseJSON):
+    position = baseJSON.get("position") or {}
+    return BaseSnapshot(
+        baseId=baseJSON["baseId"],
+        name=baseJSON.get("name"),
+        online=baseJSON.get("online"),
+        onlineQuality=baseJSON.get("onlineQuality"),
+        networkName=baseJSON.get("networkName"),
+        latitude=position.get("latitude"),
+        longitude=position.get("longitude"),
+    )
+
+
+class TryFiError(exceptions.HomeAssistantError):
+    """Error to indicate a failed TryFi API request."""
+
+
+class TryFiAuthError(TryFiError):
+    """Error to indicate the TryFi credentials or session were rejected."""
+
+
+class TryFiRateLimitError(TryFiError):
+    """Error to indicate TryFi asked us to slow down."""
+
+    def __init__(self, message, retryAfter=None):
+        super().__init__(message)
+        self.retryAfter = retryAfter
+
+
+class TryFiCircuitOpenError(TryFiError):
+    """Error to indicate a request was not sent because TryFi keeps failing."""
+
+
+class TryFiClient:
+    """Async counterpart of PyTryFi running on the event loop.
+
+    The account is held as immutable PetSnapshot and BaseSnapshot objects.
+    Every tier refresh parses its payload into new snapshots and swaps them
+    in with a single assignment, so readers never see a half-applied update.
+
+    Requests go through an aiohttp session backed by Home Assistant's shared
+    connector, so connections are kept alive and pooled with the rest of HA and
+    responses are transparently gzip-decoded. The session cookie returned by the
+    login call is held here and sent explicitly, which keeps accounts isolated
+    even when they share a connector.
+
+    When a Store is given the session is saved after every login, so a
+    restart can reuse it instead of logging in again. A saved session that
+    has expired is replaced on the first 401.
+
+    Every request goes through a TryFiCircuitBreaker: connection errors,
+    timeouts, 5xx and 429 answers count as failures, and a Retry-After
+    header opens the circuit for at least as long as it asks.
+
+    A tier refresh only fails as a whole when its request does. A pet or
+    base TryFi could not answer for keeps its last good snapshot, is listed
+    by failingUnits() and is fetched on its own on its TryFiUnitBackoff.
+    """
+
+    def __init__(self, session, username, password, store=None, semaphore=None):
+        self._session = session
+        self._store = store
+        self._username = username
+        self._password = password
+        self._cookies = None
+        self._userId = None
+        self._sessionId = None
+        self._pets = {}
+        self._bases = {}
+        self._statPeriods = STAT_PERIODS
+        self._statsWindowEnds = ()
+        self._breaker = TryFiCircuitBreaker()
+        self._unitBackoffs = {tier: TryFiUnitBackoff() for tier in TIERS}
+        self._semaphore = semaphore or asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+        self._timeout = aiohttp.ClientTimeout(total=REQUEST_TIMEOUT)
+
+    @property
+    def username(self):
+        return self._username
+
+    @property
+    def userId(self):
+        return self._userId
+
+    @property
+    def breaker(self):
+        return self._breaker
+
+    def unitBackoff(self, tier):
+        return self._unitBackoffs[tier]
+
+    def failingUnits(self, tier):
+        """Return the IDs of the pets or bases whose last refresh in a tier failed."""
+        return self._unitBackoffs[tier].failing
+
+    @property
+    def pets(self):
+        return tuple(self._pets.values())
+
+    @property
+    def bases(self):
+        return tuple(self._bases.values())
+
+    def restoreSnapshot(self, pets, bases):
+        """Start from the pets and bases saved by an earlier run."""
+        self._pets = {pet.petId: pet for pet in pets}
+        self._bases = {base.baseId: base for base in bases}
+
+    def _updatePets(self, updates):
+        """Swap in new snapshots for the pets whose fields changed.
+
+        Unchanged pets keep their snapshot object, which lets the coordinators
+        skip them with an identity check when diffing.
+        """
+        pets = dict(self._pets)
+        for petId, petFields in updates.items():
+            pet = pets.get(petId)
+            if pet is None:
+                continue
+            if any(getattr(pet, name) != value for name, value in petFields.items()):
+                pets[petId] = replace(pet, **petFields)
+        self._pets = pets
+
+    async def async_login(self):
+        """Log in and keep the session cookie for later requests."""
+        LOGGER.debug("Logging into TryFi")
+        params = {"email": self._username, "password": self._password}
+        response, body = await self._async_send("POST", LOGIN_URL, data=params)
+        if response.status in (400, 401, 403):
+            raise TryFiAuthError(f"Login rejected ({response.status})")
+        if response.status >= 400:
+            raise TryFiError(f"Cannot login ({response.status})")
+        payload = _decode(body)
+        cookies = {key: morsel.value for key, morsel in response.cookies.items()}
+
+        if payload.get("error"):
+            raise TryFiAuthError(payload["error"].get("message", "Login rejected"))
+
+        self._cookies = cookies
+        self._userId = payload["userId"]
+        self._sessionId = payload["sessionId"]
+        LOGGER.debug(f"Successfully logged in. UserId: {self._userId}")
+        if self._store is not None:
+            await self._store.async_save(
+                {
+                    "username": self._username,
+                    "userId": self._userId,
+                    "sessionId": self._sessionId,
+                    "cookies": self._cookies,
+                }
+            )
+
+    async def async_restore_session(self):
+        """Reuse the session saved by an earlier login, if there is one."""
+        if self._store is None:
+            return False
+        data = await self._store.async_load()
+        if not data or data.get("username") != self._username:
+            return False
+        self._cookies = data["cookies"]
+        self._userId = data["userId"]
+        self._sessionId = data["sessionId"]
+        LOGGER.debug(f"Reusing saved TryFi session. UserId: {self._userId}")
+        return True
+
+    async def _async_send(self, method, url, **kwargs):
+        """Send a request through the circuit breaker.
+
+        Returns the response together with its body, which is read before the
+        connection is released.
+        """
+        if not self._breaker.allowRequest():
+            raise TryFiCircuitOpenError(
+                f"TryFi requests paused for another {self._breaker.retryIn:.0f} seconds"
+            )
+        stats = _requestStats.get()
+        try:
+            async with self._semaphore:
+                start = time.perf_counter()
+                try:
+                    async with self._session.request(
+                        method, url, timeout=self._timeout, **kwargs
+                    ) as response:
+                        body = await response.read()
+                finally:
+                    if stats is not None:
+                        stats.calls += 1
+                        stats.networkTime += time.perf_counter() - start
+        except aiohttp.ClientError as err:
+            self._breaker.recordFailure()
+            raise TryFiError(f"Error requesting TryFi: {err}") from err
+        except asyncio.TimeoutError as err:
+            self._breaker.recordFailure()
+            raise TryFiError("Timed out requesting TryFi") from err
+        except asyncio.CancelledError:
+            self._breaker.releaseProbe()
+            raise
+
+        if response.status == 429 or response.status >= 500:
+            retryAfter = parseRetryAfter(response.headers.get("Retry-After"))
+            self._breaker.recordFailure(retryAfter)
+            if response.status == 429:
+                raise TryFiRateLimitError("Rate limited by TryFi", retryAfter)
+            raise TryFiError(f"TryFi returned {response.status}")
+        self._breaker.recordSuccess()
+        if stats is not None:
+            stats.bytesReceived += len(body)
+        return response, body
+
+    async def _async_request(self, method, partial=False, **kwargs):
+        """Issue a GraphQL request and return its data section.
+
+        With partial, GraphQL errors that left some data are returned with it
+        as (data, errors) instead of raised.
+        """
+        response, body = await self._async_send(
+            method, GRAPHQL_URL, cookies=self._cookies, **kwargs
+        )
+        if response.status == 401:
+            raise TryFiAuthError("Session rejected")
+        if response.status >= 400:
+            raise TryFiError(f"TryFi returned {response.status}")
+        payload = _decode(body)
+
+        errors = payload.get("errors") or ()
+        if errors and not (partial and payload.get("data")):
+            raise TryFiError(f"TryFi returned errors: {errors}")
+        if partial:
+            return payload["data"], errors
+        return payload["data"]
+
+    async def _async_request_with_login(self, method, **kwargs):
+        if self._cookies is None:
+            await self.async_login()
+        try:
+            return await self._async_request(method, **kwargs)
+        except TryFiAuthError:
+            LOGGER.debug("TryFi session expired, logging in again")
+            await self.async_login()
+            return await self._async_request(method, **kwargs)
+
+    async def async_query(self, qString):
+        return await self._async_request_with_login("GET", params={"query": qString})
+
+    async def async_query_partial(self, qString):
+        """Query TryFi, return the data and the errors of a partial answer."""
+        return await self._async_request_with_login(
+            "GET", partial=True, params={"query": qString}
+        )
+
+    async def async_mutation(self, qString, variables):
+        return await self._async_request_with_login(
+            "POST", json={"query": qString, "variables": variables}
+        )
+
+    async def async_update_tier(self, tier):
+        """Refresh the part of the account that belongs to one refresh tier.
+
+        Returns the RequestStats of the refresh.
+        """
+        stats = RequestStats()
+        token = _requestStats.set(stats)
+        start = time.perf_counter()
+        try:
+            if tier == TIER_DEVICE:
+                await self.async_update_devices()
+            elif tier == TIER_LOCATION:
+                await self.async_update_locations()
+            elif tier == TIER_STATS:
+                await self.async_update_stats()
+            elif tier == TIER_BASES:
+                await self.async_update_bases()
+        finally:
+            _requestStats.reset(token)
+        stats.parseTime = time.perf_counter() - start - stats.networkTime
+        return stats
+
+    async def async_update_devices(self):
+        """Refresh the pet list, pet profiles and collar details."""
+        data, errors = await self.async_query_partial(QUERY_PETS)
+        items = {}
+        for petId, petJSON in householdIndex(data, "pets").items():
+            # If pet doesn't have a collar then ignore it.
+            if petJSON.get("device") is None:
+                LOGGER.debug(f"Pet {petJSON.get('name')} has no collar. Ignoring")
+                continue
+            items[petId] = petJSON
+        # A pet missing from an answer with errors has not left the household
+        pets = await self._async_update_units(
+            TIER_DEVICE,
+            items,
+            parsePet,
+            QUERY_PET_PROFILE,
+            self._pets if errors else (),
+        )
+        members = pets.keys() | (self.failingUnits(TIER_DEVICE) & self._pets.keys())
+
+        # Pets keep the location and stats fetched by the other tiers.
+        current = dict(self._pets)
+        for petId in list(current):
+            if petId not in members:
+                del current[petId]
+        for petId in pets:
+            current.setdefault(petId, PetSnapshot(petId))
+        self._pets = current
+        self._updatePets(pets)
+        for backoff in self._unitBackoffs.values():
+            backoff.retain(current.keys() | self._bases.keys())
+
+    def _knownPets(self, items):
+        return {petId: item for petId, item in items.items() if petId in self._pets}
+
+    async def _async_update_units(self, tier, items, parse, unitQuery, expected):
+        """Parse a tier's answer pet by pet, or base by base.
+
+        items holds the JSON of each unit in the answer by ID. A unit whose
+        JSON does not parse, or that is expected but missing, keeps its
+        current data and is fetched on its own with unitQuery once its
+        backoff allows. Those requests are sent together, the client's
+        semaphore caps how many are in flight. Returns the parsed fields by
+        ID, parse returns None for a unit with nothing to update.
+        """
+        backoff = self._unitBackoffs[tier]
+        updates = {}
+        failed = [key for key in expected if key not in items]
+        for key, itemJSON in items.items():
+            try:
+                fields = parse(itemJSON)
+            except (LookupError, TypeError, ValueError) as err:
+                LOGGER.debug(f"Unable to read the {tier} data of {key}: {err!r}")
+                failed.append(key)
+                continue
+            backoff.recordSuccess(key)
+            if fields is not None:
+                updates[key] = fields
+
+        retry = []
+        for key in failed:
+            if unitQuery is None:
+                backoff.recordFailure(key)
+            elif backoff.canRetry(key):
+                retry.append(key)
+        results = await asyncio.gather(
+            *(self._async_update_unit(tier, key, parse, unitQuery) for key in retry)
+        )
+        for key, (ok, fields) in zip(retry, results):
+            if not ok:
+                backoff.recordFailure(key)
+                continue
+            backoff.recordSuccess(key)
+            if fields is not None:
+                updates[key] = fields
+        if failed:
+            LOGGER.debug(
+                f"TryFi {tier} refresh failed for {', '.join(sorted(backoff.failing))}"
+            )
+        return updates
+
+    async def _async_update_unit(self, tier, key, parse, unitQuery):
+        try:
+            data = await self.async_query(unitQuery.replace(VAR_PET_ID, key))
+            return True, parse(data.get("pet") or {})
+        except (TryFiError, LookupError, TypeError, ValueError) as err:
+            LOGGER.debug(f"Unable to refresh the {tier} data of {key} alone: {err!r}")
+            return False, None
+
+    def updateDerived(self, updates):
+        """Merge pet fields the integration derives itself, such as speed."""
+        self._updatePets(updates)
+
+    async def async_update_locations(self):
+        """Refresh the current location and connection state of every pet."""
+        data, _ = await self.async_query_partial(QUERY_LOCATION)
+        self._updatePets(
+            await self._async_update_units(
+                TIER_LOCATION,
+                self._knownPets(householdIndex(data, "pets")),
+                parsePetLocation,
+                QUERY_PET_LOCATION,
+                self._pets,
+            )
+        )
+
+    async def async_update_pet_location(self, petId):
+        """Refresh the current location and connection state of one pet."""
+        data = await self.async_query(QUERY_PET_LOCATION.replace(VAR_PET_ID, petId))
+        location = parsePetLocation(data.get("pet") or {})
+        if location is not None:
+            self._updatePets({petId: location})
+
+    async def async_update_stats(self):
+        """Refresh the daily, weekly and monthly activity and rest stats."""
+        if not self._statPeriods:
+            self._updatePets({petId: parseStats({}, ()) for petId in self._pets})
+            self._statsWindowEnds = ()
+            return
+        periods = self._statPeriods
+        windowEnds = []
+
+        def parse(petJSON):
+            stats = parseStats(petJSON, periods)
+            windowEnds.extend(parseStatsWindowEnds(petJSON))
+            return stats
+
+        data, _ = await self.async_query_partial(statsQuery(periods))
+        self._updatePets(
+            await self._async_update_units(
+                TIER_STATS,
+                self._knownPets(householdIndex(data, "pets")),
+                parse,
+                petStatsQuery(periods),
+                self._pets,
+            )
+        )
+        self._statsWindowEnds = tuple(sorted(windowEnds))
+
+    @property
+    def statPeriods(self):
+        return self._statPeriods
+
+    def setStatPeriods(self, periods):
+        """Choose the stats windows to fetch, return whether they changed.
+
+        The fields of the windows left out are cleared on the next refresh.
+        """
+        periods = tuple(period for period in STAT_PERIODS if period in periods)
+        if periods == self._statPeriods:
+            return False
+        self._statPeriods = periods
+        return True
+
+    def nextStatsRollover(self, now):
+        """Return the first end of a stats window after now, None if unknown."""
+        return next((end for end in self._statsWindowEnds if end > now), None)
+
+    async def async_fetch_history(self):
+        """Return the daily history of every pet, see parseHistory()."""
+        data = await self.async_query(QUERY_HISTORY)
+        return {
+            petJSON["id"]: parseHistory(petJSON)
+            for petJSON in householdItems(data, "pets")
+            if petJSON["id"] in self._pets
+        }
+
+    async def async_update_bases(self):
+        """Refresh the charging bases and their online state."""
+        data, errors = await self.async_query_partial(QUERY_BASES)
+        # TryFi has no single-base query, a failed base waits for the next
+        # refresh of the tier
+        parsed = await self._async_update_units(
+            TIER_BASES,
+            householdIndex(data, "bases", "baseId"),
+            parseBase,
+            None,
+            self._bases if errors else (),
+        )
+        kept = self.failingUnits(TIER_BASES) & self._bases.keys()
+        bases = {}
+        for baseId in [*parsed, *(kept - parsed.keys())]:
+            base = parsed.get(baseId)
+            previous = self._bases.get(baseId)
+            bases[baseId] = previous if base is None or previous == base else base
+        self._bases = bases
+
+    async def async_turn_on_off_led(self, pet, action):
+        data = await self.async_mutation(
+            MUTATION_DEVICE_OPS + MUTATION_FRAGMENTS,
+            {"input": {"moduleId": pet.moduleId, "ledEnabled": bool(action)}},
+        )
+        self._updatePets(
+            {pet.petId: parseDevice(data["updateDeviceOperationParams"])}
+        )
+
+    async def async_set_led_color_code(self, pet, colorCode):
+        data = await self.async_mutation(
+            MUTATION_SET_LED_COLOR + MUTATION_FRAGMENTS,
+            {"moduleId": pet.moduleId, "ledColorCode": int(colorCode)},
+        )
+        self._updatePets({pet.petId: parseDevice(data["setDeviceLed"])})
+
+    async def async_set_light(self, pet, on, colorCode=None):
+        """Switch the collar light and, when turning it on, set its colour.
+
+        The pet's device details returned by the mutation are applied, so
+        only that pet is refreshed.
+        """
+        if not on or colorCode is None:
+            await self.async_turn_on_off_led(pet, on)
+            return
+        data = await self.async_mutation(
+            MUTATION_SET_LIGHT + MUTATION_FRAGMENTS,
+            {
+                "input": {"moduleId": pet.moduleId, "ledEnabled": True},
+                "moduleId": pet.moduleId,
+                "ledColorCode": int(colorCode),
+            },
+        )
+        self._updatePets({pet.petId: parseDevice(data["setDeviceLed"])})
+
+    async def async_set_lost_dog_mode(self, pet, action):
+        mode = PET_MODE_LOST if action else PET_MODE_NORMAL
+        data = await self.async_mutation(
+            MUTATION_DEVICE_OPS + MUTATION_FRAGMENTS,
+            {"input": {"moduleId": pet.moduleId, "mode": mode}},
+        )
+        self._updatePets(
+            {pet.petId: parseDevice(data["updateDeviceOperationParams"])}
+        )
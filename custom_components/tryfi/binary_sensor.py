@@ -4,32 +4,40 @@ from homeassistant.components.binary_sensor import (
     BinarySensorDeviceClass,
     BinarySensorEntity
 )
-from homeassistant.helpers.update_coordinator import CoordinatorEntity
 
-from .const import DOMAIN
+from homeassistant.core import callback
+
+from . import async_track_household, fieldContext
+from .const import DOMAIN, TIER_DEVICE
+from .entity import TryFiEntity
 
 LOGGER = logging.getLogger(__name__)
 
 async def async_setup_entry(hass, config_entry, async_add_devices):
     """Add binary sensors for passed config_entry in HA."""
-    coordinator = hass.data[DOMAIN][config_entry.entry_id]
+    tryfiData = hass.data[DOMAIN][config_entry.entry_id]
+    coordinator = tryfiData.coordinator(TIER_DEVICE)
 
-    tryfi = coordinator.data
+    @callback
+    def async_add_pets(pets):
+        new_devices = []
+        for pet in pets:
+            LOGGER.debug(f"Adding Pet Battery Charging Binary Sensor: {pet}")
+            new_devices.append(TryFiBatteryChargingBinarySensor(hass, pet, coordinator))
+        if new_devices:
+            async_add_devices(new_devices)
 
-    new_devices = []
-    for pet in tryfi.pets:
-        LOGGER.debug(f"Adding Pet Battery Charging Binary Sensor: {pet}")
-        new_devices.append(TryFiBatteryChargingBinarySensor(hass, pet, coordinator))
-    if new_devices:
-        async_add_devices(new_devices)
+    async_track_household(hass, config_entry, async_add_pets)
 
-class TryFiBatteryChargingBinarySensor(CoordinatorEntity, BinarySensorEntity):
+class TryFiBatteryChargingBinarySensor(TryFiEntity, BinarySensorEntity):
     """Representation of a Binary Sensor."""
 
     def __init__(self, hass, pet, coordinator):
         self._hass = hass
         self._petId = pet.petId
-        super().__init__(coordinator)
+        super().__init__(
+            coordinator, fieldContext(self._petId, "name", "isCharging")
+        )
 
     @property
     def name(self):
@@ -49,10 +57,6 @@ class TryFiBatteryChargingBinarySensor(CoordinatorEntity, BinarySensorEntity):
     def pet(self):
         return self.coordinator.data.getPet(self.petId)
 
-    @property
-    def device(self):
-        return self.pet.device
-
     @property
     def device_id(self):
         return self.unique_id
@@ -64,7 +68,7 @@ class TryFiBatteryChargingBinarySensor(CoordinatorEntity, BinarySensorEntity):
 
     @property
     def isCharging(self):
-        return bool(self.pet.device.isCharging)
+        return bool(self.pet.isCharging)
 
     @property
     def icon(self):
@@ -86,5 +90,5 @@ class TryFiBatteryChargingBinarySensor(CoordinatorEntity, BinarySensorEntity):
             "name": self.pet.name,
             "manufacturer": "TryFi",
             "model": self.pet.breed,
-            "sw_version": self.pet.device.buildId,
+            "sw_version": self.pet.buildId,
         }
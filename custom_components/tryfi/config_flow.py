@@ -3,15 +3,33 @@ import logging
 import voluptuous as vol
 from homeassistant import config_entries, core, exceptions
 from homeassistant.core import callback
-from pytryfi import PyTryFi
+from homeassistant.helpers import config_validation as cv
 
-from . import CannotConnect, async_connect_or_timeout
+from . import (
+    CannotConnect,
+    async_connect_or_timeout,
+    async_get_pool,
+    sessionStore,
+)
+from .api import TryFiAuthError, TryFiClient, TryFiError
 from .const import (  # pylint:disable=unused-import
+    CONF_JITTER_DISTANCE,
+    CONF_JITTER_INTERVAL,
     CONF_PASSWORD,
+    CONF_POLLING_MAX,
+    CONF_POLLING_MIN,
     CONF_POLLING_RATE,
+    CONF_STAT_PERIODS,
+    CONF_TIER_INTERVALS,
     CONF_USERNAME,
+    DEFAULT_JITTER_DISTANCE,
+    DEFAULT_JITTER_INTERVAL,
+    DEFAULT_POLLING_MAX,
+    DEFAULT_POLLING_MIN,
     DEFAULT_POLLING_RATE,
+    DEFAULT_TIER_INTERVALS,
     DOMAIN,
+    SENSOR_STATS_BY_TIME,
 )
 
 _LOGGER = logging.getLogger(__name__)
@@ -43,10 +61,19 @@ async def validate_input(hass: core.HomeAssistant, data: dict):
             raise InvalidPolling
     except:
         raise InvalidPolling
+    # Only log in: the account itself is fetched once the entry is set up,
+    # which then reuses the session saved here.
+    tryfi = TryFiClient(
+        async_get_pool(hass).session,
+        data[CONF_USERNAME],
+        data[CONF_PASSWORD],
+        sessionStore(hass, data[CONF_USERNAME]),
+    )
     try:
-        #tryfi = PyTryFi(username=data[CONF_USERNAME], password=data[CONF_PASSWORD])
-        tryfi = await hass.async_add_executor_job(PyTryFi, data[CONF_USERNAME], data[CONF_PASSWORD])
-    except:
+        await tryfi.async_login()
+    except TryFiAuthError:
+        raise InvalidAuth
+    except TryFiError:
         raise CannotConnect
 
     info = await async_connect_or_timeout(hass, tryfi)
@@ -54,6 +81,37 @@ async def validate_input(hass: core.HomeAssistant, data: dict):
     return {"title": data[CONF_USERNAME]}
 
 
+def validate_polling_bounds(data: dict):
+    try:
+        pollingMin = int(data[CONF_POLLING_MIN])
+        pollingMax = int(data[CONF_POLLING_MAX])
+    except (KeyError, ValueError):
+        raise InvalidPolling
+    if pollingMin < 1 or pollingMax < pollingMin:
+        raise InvalidPolling
+
+
+def validate_intervals(data: dict):
+    try:
+        intervals = [int(data[CONF_POLLING_RATE])] + [
+            int(data[option]) for option in CONF_TIER_INTERVALS.values()
+        ]
+    except (KeyError, ValueError):
+        raise InvalidPolling
+    if min(intervals) < 1:
+        raise InvalidPolling
+
+
+def validate_jitter(data: dict):
+    try:
+        jitterDistance = float(data.get(CONF_JITTER_DISTANCE, DEFAULT_JITTER_DISTANCE))
+        jitterInterval = float(data.get(CONF_JITTER_INTERVAL, DEFAULT_JITTER_INTERVAL))
+    except ValueError:
+        raise InvalidJitter
+    if jitterDistance < 0 or jitterInterval < 0:
+        raise InvalidJitter
+
+
 class ConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
     """Handle a config flow for Hello World."""
 
@@ -86,6 +144,8 @@ class ConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
                 return self.async_create_entry(title=info["title"], data=user_input)
             except CannotConnect:
                 errors["base"] = "cannot_connect"
+            except InvalidAuth:
+                errors["base"] = "invalid_auth"
             except InvalidPolling:
                 errors["base"] = "invalid_polling"
             except Exception:  # pylint: disable=broad-except
@@ -107,8 +167,17 @@ class OptionsFlowHandler(config_entries.OptionsFlow):
 
     async def async_step_init(self, user_input=None):
         """Manage the options."""
+        errors = {}
         if user_input is not None:
-            return self.async_create_entry(title="", data=user_input)
+            try:
+                validate_intervals(user_input)
+                validate_polling_bounds(user_input)
+                validate_jitter(user_input)
+                return self.async_create_entry(title="", data=user_input)
+            except InvalidPolling:
+                errors["base"] = "invalid_polling"
+            except InvalidJitter:
+                errors["base"] = "invalid_jitter"
 
         return self.async_show_form(
             step_id="init",
@@ -117,11 +186,56 @@ class OptionsFlowHandler(config_entries.OptionsFlow):
                     vol.Optional(
                         CONF_POLLING_RATE,
                         default=self.config_entry.options.get(
-                            CONF_POLLING_RATE, DEFAULT_POLLING_RATE
+                            CONF_POLLING_RATE,
+                            self.config_entry.data.get(
+                                CONF_POLLING_RATE, DEFAULT_POLLING_RATE
+                            ),
+                        ),
+                    ): str,
+                    vol.Optional(
+                        CONF_POLLING_MIN,
+                        default=self.config_entry.options.get(
+                            CONF_POLLING_MIN, DEFAULT_POLLING_MIN
+                        ),
+                    ): str,
+                    vol.Optional(
+                        CONF_POLLING_MAX,
+                        default=self.config_entry.options.get(
+                            CONF_POLLING_MAX, DEFAULT_POLLING_MAX
                         ),
                     ): str,
+                    vol.Optional(
+                        CONF_JITTER_DISTANCE,
+                        default=self.config_entry.options.get(
+                            CONF_JITTER_DISTANCE, DEFAULT_JITTER_DISTANCE
+                        ),
+                    ): str,
+                    vol.Optional(
+                        CONF_JITTER_INTERVAL,
+                        default=self.config_entry.options.get(
+                            CONF_JITTER_INTERVAL, DEFAULT_JITTER_INTERVAL
+                        ),
+                    ): str,
+                    **{
+                        vol.Optional(
+                            option,
+                            default=self.config_entry.options.get(
+                                option, str(DEFAULT_TIER_INTERVALS[tier])
+                            ),
+                        ): str
+                        for tier, option in CONF_TIER_INTERVALS.items()
+                    },
+                    vol.Optional(
+                        CONF_STAT_PERIODS,
+                        default=self.config_entry.options.get(
+                            CONF_STAT_PERIODS, SENSOR_STATS_BY_TIME
+                        ),
+                    ): cv.multi_select(
+                        {period: period.title() for period in SENSOR_STATS_BY_TIME}
+                    ),
                 }
             ),
+            errors=errors,
         )
 
 
@@ -129,5 +243,13 @@ class InvalidPolling(exceptions.HomeAssistantError):
     """Error to indicate we cannot use the polling rate"""
 
 
+class InvalidJitter(exceptions.HomeAssistantError):
+    """Error to indicate the jitter filter settings are not valid"""
+
+
 class CannotConnect(exceptions.HomeAssistantError):
     """Error to indicate we cannot use the polling rate"""
+
+
+class InvalidAuth(exceptions.HomeAssistantError):
+    """Error to indicate the credentials were rejected"""
@@ -2,7 +2,88 @@ DOMAIN = "tryfi"
 PLATFORMS = ["device_tracker", "light", "sensor", "select", "binary_sensor"]
 DEFAULT_POLLING_RATE = "10"
 CONF_POLLING_RATE = "polling"
+DEFAULT_POLLING_MIN = "5"
+CONF_POLLING_MIN = "polling_min"
+DEFAULT_POLLING_MAX = "300"
+CONF_POLLING_MAX = "polling_max"
+# The tracker keeps its position until a fix moves further than this many
+# metres, or its accuracy radius if larger, and at most once per interval
+DEFAULT_JITTER_DISTANCE = "25"
+CONF_JITTER_DISTANCE = "jitter_distance"
+DEFAULT_JITTER_INTERVAL = "0"
+CONF_JITTER_INTERVAL = "jitter_interval"
+CONF_DEVICE_INTERVAL = "device_interval"
+CONF_STATS_INTERVAL = "stats_interval"
+CONF_BASES_INTERVAL = "bases_interval"
+# Stats windows fetched, a subset of SENSOR_STATS_BY_TIME
+CONF_STAT_PERIODS = "stat_periods"
 CONF_USERNAME = "username"
 CONF_PASSWORD = "password"
 SENSOR_STATS_BY_TIME = ["DAILY", "WEEKLY", "MONTHLY"]
 SENSOR_STATS_BY_TYPE = ["STEPS", "DISTANCE", "SLEEP", "NAP"]  # FUTURE COULD INCLUDE STEP GOAL
+# Requests in flight at once, across all config entries
+MAX_CONCURRENT_REQUESTS = 4
+DATA_POOL = "pool"
+REQUEST_TIMEOUT = 30
+TIER_LOCATION = "location"
+TIER_DEVICE = "device"
+TIER_STATS = "stats"
+TIER_BASES = "bases"
+# Refresh intervals in seconds. The location tier follows the configured
+# polling rate, the others change far less often. The stats tier also
+# refreshes when its windows roll over.
+DEFAULT_TIER_INTERVALS = {
+    TIER_DEVICE: 300,
+    TIER_STATS: 3600,
+    TIER_BASES: 1800,
+}
+# Option overriding the interval of each tier
+CONF_TIER_INTERVALS = {
+    TIER_DEVICE: CONF_DEVICE_INTERVAL,
+    TIER_STATS: CONF_STATS_INTERVAL,
+    TIER_BASES: CONF_BASES_INTERVAL,
+}
+CONNECTION_STATE_BASE = "ConnectedToBase"
+PLACE_UNKNOWN = "UNKNOWN"
+TIERS = [TIER_DEVICE, TIER_LOCATION, TIER_STATS, TIER_BASES]
+STORAGE_VERSION = 1
+STORAGE_KEY_SESSION = f"{DOMAIN}.session"
+STORAGE_KEY_SNAPSHOT = f"{DOMAIN}.snapshot"
+# Seconds the cached snapshot may lag behind the last refresh
+SNAPSHOT_SAVE_DELAY = 60
+ATTR_STALE = "stale"
+# Dispatcher signals announcing the pets and bases a config entry gained
+SIGNAL_PETS_ADDED = f"{DOMAIN}_pets_added_{{}}"
+SIGNAL_BASES_ADDED = f"{DOMAIN}_bases_added_{{}}"
+# Number of refreshes per tier the rolling percentiles are computed over
+METRICS_WINDOW = 100
+# Failed refreshes back off exponentially from their interval up to this
+BACKOFF_MAX = 900
+# First delay before a pet that failed alone is fetched on its own again
+UNIT_BACKOFF_BASE = 60
+# Consecutive failed requests that open the circuit breaker
+CIRCUIT_FAILURE_THRESHOLD = 3
+# First open period of the circuit breaker, doubled every time it reopens
+CIRCUIT_COOLDOWN = 30
+CIRCUIT_CLOSED = "closed"
+CIRCUIT_OPEN = "open"
+CIRCUIT_HALF_OPEN = "half_open"
+# GPS fixes kept in memory per pet, 32 bytes each
+TRACK_CAPACITY = 2880
+SERVICE_GET_TRACK = "get_track"
+ATTR_START = "start"
+ATTR_END = "end"
+# Derived speeds (km/h) and distances (m) are rounded to these steps
+SPEED_RESOLUTION = 0.5
+DISTANCE_RESOLUTION = 10
+STORAGE_KEY_HISTORY = f"{DOMAIN}.history"
+# Daily rest summaries fetched per import; steps cover the current month
+HISTORY_DAYS = 31
+# Seconds between imports of the completed days into long-term statistics
+HISTORY_IMPORT_INTERVAL = 6 * 3600
+# Seconds after a stats window ends before its rollover is fetched
+ROLLOVER_DELAY = 30
+# Seconds light commands are coalesced for before one request is sent
+LIGHT_DEBOUNCE = 0.5
+# Seconds between the location refreshes of a lost pet
+LOST_POLL_INTERVAL = 3
@@ -18,29 +18,47 @@ from homeassistant.helpers.update_coordinator import (
     UpdateFailed,
 )
 
-from .const import DOMAIN
+from . import async_track_household, fieldContext
+from .const import DOMAIN, TIER_LOCATION
+from .entity import TryFiEntity
 
 LOGGER = logging.getLogger(__name__)
 
 
 async def async_setup_entry(hass, config_entry, async_add_devices):
     """Add sensors for passed config_entry in HA."""
-    coordinator = hass.data[DOMAIN][config_entry.entry_id]
+    tryfiData = hass.data[DOMAIN][config_entry.entry_id]
+    coordinator = tryfiData.coordinator(TIER_LOCATION)
 
-    tryfi = coordinator.data
+    @callback
+    def async_add_pets(pets):
+        new_devices = []
+        for pet in pets:
+            new_devices.append(
+                TryFiPetTracker(async_add_devices, hass, pet, coordinator)
+            )
+        if new_devices:
+            async_add_devices(new_devices)
 
-    new_devices = []
-    for pet in tryfi.pets:
-        new_devices.append(TryFiPetTracker(async_add_devices, hass, pet, coordinator))
-    if new_devices:
-        async_add_devices(new_devices, True)
+    async_track_household(hass, config_entry, async_add_pets)
 
 
-class TryFiPetTracker(CoordinatorEntity, TrackerEntity):
+class TryFiPetTracker(TryFiEntity, TrackerEntity):
     def __init__(self, see, hass, pet, coordinator):
         self._petId = pet.petId
         self._see = see
-        super().__init__(coordinator)
+        super().__init__(
+            coordinator,
+            fieldContext(
+                self._petId,
+                "name",
+                "photoLink",
+                "trackedLatitude",
+                "trackedLongitude",
+                "trackedAccuracy",
+                "batteryPercent",
+            ),
+        )
 
     @property
     def name(self):
@@ -68,11 +86,17 @@ class TryFiPetTracker(CoordinatorEntity, TrackerEntity):
 
     @property
     def latitude(self):
-        return float(self.pet.currLatitude)
+        return self.pet.trackedLatitude
 
     @property
     def longitude(self):
-        return float(self.pet.currLongitude)
+        return self.pet.trackedLongitude
+
+    @property
+    def location_accuracy(self):
+        if self.pet.trackedAccuracy is None:
+            return 0
+        return round(self.pet.trackedAccuracy)
 
     @property
     def source_type(self):
@@ -81,7 +105,7 @@ class TryFiPetTracker(CoordinatorEntity, TrackerEntity):
 
     @property
     def battery_level(self):
-        return self.pet.device.batteryPercent
+        return self.pet.batteryPercent
 
     @property
     def device_info(self):
@@ -90,5 +114,5 @@ class TryFiPetTracker(CoordinatorEntity, TrackerEntity):
             "name": self.pet.name,
             "manufacturer": "TryFi",
             "model": self.pet.breed,
-            "sw_version": self.pet.device.buildId,
+            "sw_version": self.pet.buildId,
         }
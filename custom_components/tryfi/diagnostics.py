@@ -0,0 +1,30 @@
+"""Diagnostics support for TryFi."""
+from homeassistant.components.diagnostics import async_redact_data
+from homeassistant.util import dt as dt_util
+
+from .const import CONF_PASSWORD, CONF_USERNAME, DOMAIN, TIER_STATS
+
+TO_REDACT = {CONF_USERNAME, CONF_PASSWORD}
+
+
+async def async_get_config_entry_diagnostics(hass, entry):
+    """Return the circuit breaker state, and the refresh metrics and failing
+    pets or bases of every tier."""
+    tryfiData = hass.data[DOMAIN][entry.entry_id]
+    now = dt_util.utcnow()
+    return {
+        "entry": async_redact_data(entry.as_dict(), TO_REDACT),
+        "pets": len(tryfiData.tryfi.pets),
+        "bases": len(tryfiData.tryfi.bases),
+        "circuit": tryfiData.tryfi.breaker.asDict(),
+        "next_stats_rollover": tryfiData.coordinator(TIER_STATS).nextRollover,
+        "tiers": {
+            tier: {
+                "update_interval": coordinator.update_interval.total_seconds(),
+                "last_update_success": coordinator.last_update_success,
+                "metrics": coordinator.metrics.asDict(now),
+                "failing": tryfiData.tryfi.unitBackoff(tier).asDict(),
+            }
+            for tier, coordinator in tryfiData.coordinators.items()
+        },
+    }
@@ -0,0 +1,40 @@
+"""Base entity of the TryFi platforms."""
+from homeassistant.core import callback
+from homeassistant.helpers.update_coordinator import CoordinatorEntity
+
+from .const import ATTR_STALE
+
+
+class TryFiEntity(CoordinatorEntity):
+    """Coordinator entity that flags values restored from the cached snapshot.
+
+    Until the first live refresh of its tier the entity shows the values saved
+    by the previous run and carries a stale attribute, as it does while the
+    refresh fails for its pet or base alone.
+    """
+
+    @property
+    def _dataKey(self):
+        """Return the ID of the pet or base the entity reads, from its context."""
+        if not self.coordinator_context:
+            return None
+        key, _ = next(iter(self.coordinator_context))
+        return key
+
+    @callback
+    def _handle_coordinator_update(self):
+        # The entities of a pet or base that left the household have nothing
+        # to show until their device removal reaches them
+        key = self._dataKey
+        if key is not None:
+            data = self.coordinator.data
+            if data.getPet(key) is None and data.getBase(key) is None:
+                return
+        super()._handle_coordinator_update()
+
+    @property
+    def extra_state_attributes(self):
+        data = self.coordinator.data
+        if data is not None and data.isStale(self._dataKey):
+            return {ATTR_STALE: True}
+        return None
@@ -0,0 +1,126 @@
+"""Backfill of the pets' daily history into long-term statistics."""
+import asyncio
+import logging
+
+from homeassistant.const import UnitOfTime
+from homeassistant.helpers.storage import Store
+from homeassistant.util import dt as dt_util, slugify
+
+from .api import TryFiError
+from .const import DOMAIN, STORAGE_KEY_HISTORY, STORAGE_VERSION
+
+LOGGER = logging.getLogger(__name__)
+
+# Name, unit and divisor of each series returned by parseHistory()
+HISTORY_SERIES = {
+    "steps": ("Daily Steps", "steps", 1),
+    "sleep": ("Daily Sleep", UnitOfTime.MINUTES, 60),
+    "nap": ("Daily Nap", UnitOfTime.MINUTES, 60),
+}
+
+
+def historyStore(hass, entryId):
+    return Store(hass, STORAGE_VERSION, f"{STORAGE_KEY_HISTORY}.{entryId}")
+
+
+def statisticId(petId, series):
+    return f"{DOMAIN}:{slugify(petId)}_daily_{series}"
+
+
+def _dayStart(date):
+    """Return the local midnight starting the day of a TryFi date."""
+    if date.tzinfo is not None:
+        date = dt_util.as_local(date)
+    return dt_util.start_of_local_day(date.date())
+
+
+class TryFiHistoryImporter:
+    """Imports the completed days of every pet into long-term statistics.
+
+    Each day becomes one row starting at local midnight, holding the day's
+    total and the running sum. The last imported day and the sum reached are
+    stored per statistic, so an import only adds the days completed since the
+    previous one and a downtime is filled in, as far back as TryFi reports.
+    """
+
+    def __init__(self, hass, entryId, tryfi):
+        self._hass = hass
+        self._store = historyStore(hass, entryId)
+        self._tryfi = tryfi
+        self._marks = None
+        self._lock = asyncio.Lock()
+
+    async def async_import(self, _now=None):
+        """Fetch the history from TryFi and import the days not imported yet."""
+        if "recorder" not in self._hass.config.components:
+            return
+        async with self._lock:
+            if self._marks is None:
+                self._marks = await self._store.async_load() or {}
+            try:
+                history = await self._tryfi.async_fetch_history()
+            except TryFiError as err:
+                LOGGER.warning(f"Unable to fetch the TryFi history, retrying later: {err}")
+                return
+            except (LookupError, TypeError, ValueError) as err:
+                LOGGER.warning(f"Unable to read the TryFi history, skipping this import: {err!r}")
+                return
+
+            today = dt_util.start_of_local_day()
+            names = {pet.petId: pet.name for pet in self._tryfi.pets}
+            imported = 0
+            for petId, petHistory in history.items():
+                for series, days in petHistory.items():
+                    imported += self._importSeries(
+                        petId, names.get(petId) or petId, series, days, today
+                    )
+            if imported:
+                LOGGER.debug(f"Imported {imported} days of TryFi history")
+                await self._store.async_save(self._marks)
+
+    def _importSeries(self, petId, petName, series, days, today):
+        # Only reached once the recorder is loaded, so its requirements are
+        # not needed to load the integration
+        from homeassistant.components.recorder.models import (
+            StatisticData,
+            StatisticMetaData,
+        )
+        from homeassistant.components.recorder.statistics import (
+            async_add_external_statistics,
+        )
+
+        name, unit, divisor = HISTORY_SERIES[series]
+        seriesId = statisticId(petId, series)
+        mark = self._marks.get(seriesId) or {}
+        last = mark.get("last")
+        if last is not None:
+            last = dt_util.parse_datetime(last)
+
+        # Today is still running, its total is imported once it is complete
+        values = {}
+        for date, value in days:
+            start = _dayStart(date)
+            if start < today and (last is None or start > last):
+                values[start] = value / divisor
+        if not values:
+            return 0
+
+        total = mark.get("sum", 0)
+        rows = []
+        for start in sorted(values):
+            total += values[start]
+            rows.append(StatisticData(start=start, state=values[start], sum=total))
+        async_add_external_statistics(
+            self._hass,
+            StatisticMetaData(
+                has_mean=False,
+                has_sum=True,
+                name=f"{petName} {name}",
+                source=DOMAIN,
+                statistic_id=seriesId,
+                unit_of_measurement=unit,
+            ),
+            rows,
+        )
+        self._marks[seriesId] = {"last": rows[-1]["start"].isoformat(), "sum": total}
+        return len(rows)
@@ -1,95 +1,52 @@
 import logging
 
-from homeassistant.components.light import LightEntity, ColorMode
-from homeassistant.helpers.update_coordinator import (
-    CoordinatorEntity,
-)
-import math
+from homeassistant.components.light import ATTR_RGB_COLOR, LightEntity, ColorMode
+from homeassistant.core import callback
+from homeassistant.helpers.debounce import Debouncer
 
-from .const import DOMAIN
+from . import async_track_household, fieldContext
+from .api import TryFiError
+from .const import DOMAIN, LIGHT_DEBOUNCE, TIER_DEVICE
+from .entity import TryFiEntity
+from .palette import hex_to_rgb, ledPalette
 
 LOGGER = logging.getLogger(__name__)
 
-def hex_to_rgb(hex_color):
-    """
-    Convert a hex representation of a color to an RGB tuple.
-
-    Parameters:
-    - hex_color (str): Hexadecimal representation of the color (e.g., "#RRGGBB" or "RRGGBB").
-
-    Returns:
-    - tuple: RGB tuple (red, green, blue).
-    """
-    # Remove the "#" if present
-    hex_color = hex_color.lstrip('#')
-
-    # Convert the hex values to integers
-    rgb = tuple(int(hex_color[i:i+2], 16) for i in (0, 2, 4))
-
-    return rgb
-
-
-
-def calculate_distance(color1, color2):
-    """
-    Calculate Euclidean distance between two RGB colors.
-
-    Parameters:
-    - color1 (Tuple[int, int, int]): RGB values of the first color.
-    - color2 (Tuple[int, int, int]): RGB values of the second color.
-
-    Returns:
-    - float: The Euclidean distance between the two RGB colors.
-    """
-    return math.sqrt(sum((c1 - c2) ** 2 for c1, c2 in zip(color1, color2)))
-
-def find_closest_color_code(target_color , color_list):
-    """
-    Find the RGB color closest to the target color in a list.
-
-    Parameters:
-    - target_color (Tuple[int, int, int]): RGB values of the target color.
-    - color_list (Dict[Int: Tuple[int, int, int]]): Map of RGB colors to compare, where the key is the color code used by the device
-
-    Returns:
-    - int: The color code for this device closest to the target color
-    """
-    min_distance = float('inf')
-    closest_color = None  # type: Tuple[int, int, int]
-    # default to white, which is 8
-    closest_color_code = 8 # type: int
-
-    for code, color in color_list.items():
-        distance = calculate_distance(target_color, color)
-        if distance < min_distance:
-            min_distance = distance
-            closest_color_code = code
-
-    return closest_color_code
-
-
 
 async def async_setup_entry(hass, config_entry, async_add_devices):
     """Add sensors for passed config_entry in HA."""
-    coordinator = hass.data[DOMAIN][config_entry.entry_id]
+    tryfiData = hass.data[DOMAIN][config_entry.entry_id]
+    coordinator = tryfiData.coordinator(TIER_DEVICE)
 
-    tryfi = coordinator.data
+    @callback
+    def async_add_pets(pets):
+        new_devices = []
+        for pet in pets:
+            new_devices.append(TryFiPetLight(hass, pet, coordinator))
+        if new_devices:
+            async_add_devices(new_devices)
 
-    new_devices = []
-    for pet in tryfi.pets:
-        new_devices.append(TryFiPetLight(hass, pet, coordinator))
-    if new_devices:
-        async_add_devices(new_devices)
+    async_track_household(hass, config_entry, async_add_pets)
 
 
-class TryFiPetLight(CoordinatorEntity, LightEntity):
+class TryFiPetLight(TryFiEntity, LightEntity):
     def __init__(self, hass, pet, coordinator):
         self._petId = pet.petId
         self._hass = hass
 
-        self._colorMap = {ledColor.ledColorCode: hex_to_rgb(ledColor.hexCode) for ledColor in pet.device.availableLedColors}
+        # (on, colorCode) requested but not confirmed by TryFi yet
+        self._pending = None
+        self._debouncer = Debouncer(
+            hass,
+            LOGGER,
+            cooldown=LIGHT_DEBOUNCE,
+            immediate=False,
+            function=self._async_send_pending,
+        )
 
-        super().__init__(coordinator)
+        super().__init__(
+            coordinator, fieldContext(self._petId, "name", "ledOn", "ledColorHex")
+        )
 
     @property
     def name(self):
@@ -103,9 +60,13 @@ class TryFiPetLight(CoordinatorEntity, LightEntity):
     def pet(self):
         return self.coordinator.data.getPet(self.petId)
 
+    @property
+    def palette(self):
+        return ledPalette(self.pet.availableLedColors)
+
     @property
     def tryfi(self):
-        return self.coordinator.data
+        return self.coordinator.tryfi
 
     @property
     def unique_id(self):
@@ -117,7 +78,9 @@ class TryFiPetLight(CoordinatorEntity, LightEntity):
 
     @property
     def is_on(self):
-        return bool(self.pet.device.ledOn)
+        if self._pending is not None:
+            return self._pending[0]
+        return bool(self.pet.ledOn)
 
     @property
     def supported_color_modes(self):
@@ -129,7 +92,12 @@ class TryFiPetLight(CoordinatorEntity, LightEntity):
 
     @property
     def rgb_color(self):
-        return hex_to_rgb(self.pet.device.ledColorHex)
+        if self._pending is not None and self._pending[1] is not None:
+            return self.palette.rgb(self._pending[1])
+        # Unknown until the device tier reports it
+        if self.pet.ledColorHex is None:
+            return None
+        return hex_to_rgb(self.pet.ledColorHex)
 
     @property
     def device_info(self):
@@ -138,21 +106,49 @@ class TryFiPetLight(CoordinatorEntity, LightEntity):
             "name": self.pet.name,
             "manufacturer": "TryFi",
             "model": self.pet.breed,
-            "sw_version": self.pet.device.buildId,
+            "sw_version": self.pet.buildId,
         }
 
-    # Fix later, request update
-    def turn_on(self, **kwargs):
-        self.pet.turnOnOffLed(self.tryfi.session, True)
-
-        if "rgb_color" in kwargs:
+    async def async_turn_on(self, **kwargs):
+        colorCode = None
+        if self._pending is not None:
+            colorCode = self._pending[1]
+        if ATTR_RGB_COLOR in kwargs:
             # This is set when the color is changed
             # if the brightness(which is a no-op) is changed, for example, this is not set
-            requested_color = kwargs["rgb_color"]
-            closest_color_code = find_closest_color_code(requested_color, self._colorMap)
-
-            self.pet.setLedColorCode(self.tryfi.session, closest_color_code)
-            self.lastKnownColor = self._colorMap[closest_color_code]
-
-    def turn_off(self, **kwargs):
-        self.pet.turnOnOffLed(self.tryfi.session, False)
+            colorCode = self.palette.closestCode(kwargs[ATTR_RGB_COLOR])
+        await self._async_request(True, colorCode)
+
+    async def async_turn_off(self, **kwargs):
+        await self._async_request(False, None)
+
+    async def _async_request(self, on, colorCode):
+        """Show the requested state right away and send it once the burst of
+        commands it belongs to is over."""
+        self._pending = (on, colorCode)
+        self.async_write_ha_state()
+        await self._debouncer.async_call()
+
+    async def _async_send_pending(self):
+        # Commands issued while a request is in flight are sent after it
+        try:
+            while self._pending is not None:
+                pending = self._pending
+                try:
+                    await self.tryfi.async_set_light(self.pet, *pending)
+                except TryFiError as err:
+                    LOGGER.error(
+                        f"Unable to set the collar light of {self.pet.name}: {err}"
+                    )
+                if self._pending is pending:
+                    self._pending = None
+        finally:
+            # An unexpected error must not leave a command that was never
+            # applied showing
+            self._pending = None
+            self.coordinator.async_publish()
+            self.async_write_ha_state()
+
+    async def async_will_remove_from_hass(self):
+        await super().async_will_remove_from_hass()
+        await self._debouncer.async_shutdown()
@@ -0,0 +1,109 @@
+"""Refresh metrics kept by the TryFi coordinators."""
+import math
+from collections import deque
+
+from .const import METRICS_WINDOW
+
+PERCENTILES = (50, 95, 99)
+
+
+def percentiles(values):
+    """Return the p50, p95 and p99 of values using the nearest rank."""
+    ordered = sorted(values)
+    if not ordered:
+        return {f"p{percent}": None for percent in PERCENTILES}
+    return {
+        f"p{percent}": ordered[math.ceil(percent / 100 * len(ordered)) - 1]
+        for percent in PERCENTILES
+    }
+
+
+class TryFiRefreshMetrics:
+    """Durations, request counts and failures of one tier's refreshes.
+
+    The last refresh is kept for the diagnostic sensors, the last
+    METRICS_WINDOW successful ones for the percentiles in the diagnostics.
+    """
+
+    def __init__(self, window=METRICS_WINDOW):
+        self._durations = deque(maxlen=window)
+        self._parseTimes = deque(maxlen=window)
+        self._bytesReceived = deque(maxlen=window)
+        self._lastDuration = None
+        self._lastCalls = None
+        self._lastBytesReceived = None
+        self._lastParseTime = None
+        self._totalCalls = 0
+        self._refreshes = 0
+        self._failures = 0
+        self._consecutiveFailures = 0
+        self._lastSuccess = None
+        self._lastFailure = None
+
+    @property
+    def lastDuration(self):
+        return self._lastDuration
+
+    @property
+    def lastCalls(self):
+        return self._lastCalls
+
+    @property
+    def lastBytesReceived(self):
+        return self._lastBytesReceived
+
+    @property
+    def lastParseTime(self):
+        return self._lastParseTime
+
+    @property
+    def consecutiveFailures(self):
+        return self._consecutiveFailures
+
+    @property
+    def lastSuccess(self):
+        return self._lastSuccess
+
+    def recordSuccess(self, duration, stats, now):
+        self._refreshes += 1
+        self._consecutiveFailures = 0
+        self._lastSuccess = now
+        self._lastDuration = duration
+        self._lastCalls = stats.calls
+        self._lastBytesReceived = stats.bytesReceived
+        self._lastParseTime = stats.parseTime
+        self._totalCalls += stats.calls
+        self._durations.append(duration)
+        self._parseTimes.append(stats.parseTime)
+        self._bytesReceived.append(stats.bytesReceived)
+
+    def recordFailure(self, duration, now):
+        self._refreshes += 1
+        self._failures += 1
+        self._consecutiveFailures += 1
+        self._lastFailure = now
+        self._lastDuration = duration
+
+    def asDict(self, now):
+        return {
+            "refreshes": self._refreshes,
+            "failures": self._failures,
+            "consecutive_failures": self._consecutiveFailures,
+            "total_api_calls": self._totalCalls,
+            "last_success": self._lastSuccess,
+            "last_failure": self._lastFailure,
+            "seconds_since_last_success": (
+                None
+                if self._lastSuccess is None
+                else (now - self._lastSuccess).total_seconds()
+            ),
+            "last_refresh": {
+                "duration": self._lastDuration,
+                "api_calls": self._lastCalls,
+                "bytes_received": self._lastBytesReceived,
+                "parse_time": self._lastParseTime,
+            },
+            "duration": percentiles(self._durations),
+            "parse_time": percentiles(self._parseTimes),
+            "bytes_received": percentiles(self._bytesReceived),
+        }
@@ -0,0 +1,222 @@
+"""Data published by the TryFi coordinators."""
+from dataclasses import dataclass, fields
+from datetime import datetime
+from types import MappingProxyType
+
+from pytryfi.const import PET_MODE_LOST
+
+
+@dataclass(frozen=True, slots=True)
+class LedColor:
+    """A colour the collar light can show."""
+
+    ledColorCode: int
+    hexCode: str
+    name: str
+
+
+@dataclass(frozen=True, slots=True)
+class PetSnapshot:
+    """Immutable view of a pet and its collar holding only what the platforms read.
+
+    The profile and collar fields come from the device tier, the position and
+    connection fields from the location tier and the totals from the stats
+    tier. The location tier also derives the filtered tracked* position,
+    speed, homeDistance and placeSince from the fixes. Fields a tier has not
+    fetched yet are None.
+    """
+
+    petId: str
+    name: str | None = None
+    breed: str | None = None
+    photoLink: str | None = None
+    moduleId: str | None = None
+    buildId: str | None = None
+    batteryPercent: int | None = None
+    isCharging: bool | None = None
+    ledOn: bool | None = None
+    ledColorHex: str | None = None
+    availableLedColors: tuple = ()
+    mode: str | None = None
+    connectionStateType: str | None = None
+    connectionStateDate: datetime | None = None
+    activityType: str | None = None
+    areaName: str | None = None
+    currLatitude: float | None = None
+    currLongitude: float | None = None
+    currAccuracy: float | None = None
+    currFixTime: datetime | None = None
+    trackedLatitude: float | None = None
+    trackedLongitude: float | None = None
+    trackedAccuracy: float | None = None
+    trackedTime: datetime | None = None
+    currStartTime: datetime | None = None
+    currPlaceName: str | None = None
+    currPlaceAddress: str | None = None
+    speed: float | None = None
+    homeDistance: float | None = None
+    placeSince: datetime | None = None
+    dailySteps: int | None = None
+    weeklySteps: int | None = None
+    monthlySteps: int | None = None
+    dailyTotalDistance: float | None = None
+    weeklyTotalDistance: float | None = None
+    monthlyTotalDistance: float | None = None
+    dailySleep: int | None = None
+    weeklySleep: int | None = None
+    monthlySleep: int | None = None
+    dailyNap: int | None = None
+    weeklyNap: int | None = None
+    monthlyNap: int | None = None
+
+    @property
+    def isLost(self):
+        return self.mode == PET_MODE_LOST
+
+
+@dataclass(frozen=True, slots=True)
+class BaseSnapshot:
+    """Immutable view of a charging base."""
+
+    baseId: str
+    name: str | None = None
+    online: bool | None = None
+    onlineQuality: str | None = None
+    networkName: str | None = None
+    latitude: float | None = None
+    longitude: float | None = None
+
+
+PET_FIELD_NAMES = tuple(field.name for field in fields(PetSnapshot))
+BASE_FIELD_NAMES = tuple(field.name for field in fields(BaseSnapshot))
+
+
+class TryFiSnapshot:
+    """Immutable lookup of the account's pets and bases by id.
+
+    A new snapshot is published once per coordinator refresh so entity
+    properties resolve their pet or base with a dict lookup, and always read
+    values that belong to the same refresh. A stale snapshot was restored from
+    disk and has not been confirmed by a live refresh yet. The failing pets
+    and bases kept their last good data when the refresh failed for them.
+    """
+
+    __slots__ = ("_pets", "_bases", "_stale", "_failing")
+
+    def __init__(self, pets, bases, stale=False, failing=frozenset()):
+        self._pets = MappingProxyType({pet.petId: pet for pet in pets})
+        self._bases = MappingProxyType({base.baseId: base for base in bases})
+        self._stale = stale
+        self._failing = failing
+
+    @property
+    def pets(self):
+        return self._pets
+
+    @property
+    def bases(self):
+        return self._bases
+
+    @property
+    def stale(self):
+        return self._stale
+
+    @property
+    def failing(self):
+        return self._failing
+
+    def isStale(self, key):
+        return self._stale or key in self._failing
+
+    def getPet(self, petId):
+        return self._pets.get(petId)
+
+    def getBase(self, baseId):
+        return self._bases.get(baseId)
+
+
+def _changedFields(changed, key, previous, current, names):
+    if previous is current:
+        return
+    if previous is None:
+        changed.update((key, name) for name in names)
+        return
+    for name in names:
+        if getattr(previous, name) != getattr(current, name):
+            changed.add((key, name))
+
+
+def changedFields(previous, current):
+    """Return the (key, field) pairs whose value differs between two snapshots."""
+    changed = set()
+    for petId, pet in current.pets.items():
+        _changedFields(changed, petId, previous.getPet(petId), pet, PET_FIELD_NAMES)
+    for baseId, base in current.bases.items():
+        _changedFields(
+            changed, baseId, previous.getBase(baseId), base, BASE_FIELD_NAMES
+        )
+    # Entities of a pet or base that started or stopped failing update their
+    # stale marker
+    for key in previous.failing ^ current.failing:
+        if key in current.pets:
+            changed.update((key, name) for name in PET_FIELD_NAMES)
+        elif key in current.bases:
+            changed.update((key, name) for name in BASE_FIELD_NAMES)
+    return changed
+
+
+# Fields serialized as ISO 8601 strings in the cached snapshot
+DATE_FIELD_NAMES = (
+    "connectionStateDate",
+    "currStartTime",
+    "currFixTime",
+    "trackedTime",
+    "placeSince",
+)
+
+
+def _dumpPet(pet):
+    data = {name: getattr(pet, name) for name in PET_FIELD_NAMES}
+    for name in DATE_FIELD_NAMES:
+        if data[name] is not None:
+            data[name] = data[name].isoformat()
+    data["availableLedColors"] = [
+        {"ledColorCode": color.ledColorCode, "hexCode": color.hexCode, "name": color.name}
+        for color in pet.availableLedColors
+    ]
+    return data
+
+
+def _loadPet(data):
+    data = {name: data[name] for name in PET_FIELD_NAMES if name in data}
+    for name in DATE_FIELD_NAMES:
+        if data.get(name) is not None:
+            data[name] = datetime.fromisoformat(data[name])
+    data["availableLedColors"] = tuple(
+        LedColor(**color) for color in data.get("availableLedColors") or ()
+    )
+    return PetSnapshot(**data)
+
+
+def dumpSnapshot(pets, bases):
+    """Return the pets and bases as JSON serializable data."""
+    return {
+        "pets": [_dumpPet(pet) for pet in pets],
+        "bases": [
+            {name: getattr(base, name) for name in BASE_FIELD_NAMES} for base in bases
+        ],
+    }
+
+
+def loadSnapshot(data):
+    """Return the pets and bases saved by dumpSnapshot().
+
+    Fields that are no longer part of the snapshots are dropped, missing ones
+    keep their defaults.
+    """
+    pets = tuple(_loadPet(pet) for pet in data["pets"])
+    bases = tuple(
+        BaseSnapshot(**{name: base[name] for name in BASE_FIELD_NAMES if name in base})
+        for base in data["bases"]
+    )
+    return pets, bases
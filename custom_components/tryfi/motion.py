@@ -0,0 +1,91 @@
+"""Speed, distance from home and dwell of the pets, derived from their fixes."""
+import math
+
+from homeassistant.util import dt as dt_util
+from pytryfi.const import PET_ACTIVITY_ONGOINGWALK
+
+from .const import DISTANCE_RESOLUTION, PLACE_UNKNOWN, SPEED_RESOLUTION
+
+# Mean radius of the earth in metres
+EARTH_RADIUS = 6371008.8
+
+
+def haversine(latitude1, longitude1, latitude2, longitude2):
+    """Return the great-circle distance in metres between two points."""
+    phi1 = math.radians(latitude1)
+    phi2 = math.radians(latitude2)
+    a = (
+        math.sin((phi2 - phi1) / 2) ** 2
+        + math.cos(phi1)
+        * math.cos(phi2)
+        * math.sin(math.radians(longitude2 - longitude1) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS * math.asin(math.sqrt(a))
+
+
+def _quantize(value, resolution):
+    return round(round(value / resolution) * resolution, 2)
+
+
+def trackedFields(pet, fixTime, minDistance, minInterval):
+    """Return the position fields the tracker publishes for a pet, or {} to
+    keep the published position.
+
+    A fix only replaces the tracked position once it is further away than
+    minDistance or its own accuracy radius, whichever is larger, and at least
+    minInterval seconds after the last move, so a collar resting on its base
+    does not move the tracker on every poll. The raw fix stays in the
+    curr* fields and the track.
+    """
+    if pet.trackedLatitude is not None:
+        distance = haversine(
+            pet.trackedLatitude, pet.trackedLongitude, pet.currLatitude, pet.currLongitude
+        )
+        if distance <= max(minDistance, pet.currAccuracy or 0):
+            return {}
+        if fixTime - pet.trackedTime.timestamp() < minInterval:
+            return {}
+    return {
+        "trackedLatitude": pet.currLatitude,
+        "trackedLongitude": pet.currLongitude,
+        "trackedAccuracy": pet.currAccuracy,
+        "trackedTime": dt_util.utc_from_timestamp(fixTime),
+    }
+
+
+def motionFields(pet, previous, lastFix, fixTime, home, now, staleAfter):
+    """Return the derived PetSnapshot fields of a pet after a location refresh.
+
+    previous is the pet as last published, lastFix the (timestamp, latitude,
+    longitude) fix before this refresh, or None when the fix did not change.
+    A walk whose fix has not changed for staleAfter seconds reports a speed
+    of 0 instead of the speed of its last move.
+    The distance from home follows the tracked position. Speed and distance
+    are rounded to SPEED_RESOLUTION and DISTANCE_RESOLUTION so GPS noise does
+    not rewrite their state, and dwell
+    is published as the time the pet arrived at its place, which only changes
+    when the place does.
+    """
+    fields = {}
+    if pet.activityType != PET_ACTIVITY_ONGOINGWALK:
+        fields["speed"] = 0.0
+    elif lastFix is not None and fixTime > lastFix[0]:
+        metres = haversine(lastFix[1], lastFix[2], pet.currLatitude, pet.currLongitude)
+        fields["speed"] = _quantize(metres / (fixTime - lastFix[0]) * 3.6, SPEED_RESOLUTION)
+    elif now.timestamp() - fixTime > staleAfter:
+        fields["speed"] = 0.0
+
+    if home is not None and pet.trackedLatitude is not None:
+        fields["homeDistance"] = _quantize(
+            haversine(home[0], home[1], pet.trackedLatitude, pet.trackedLongitude),
+            DISTANCE_RESOLUTION,
+        )
+
+    place = pet.currPlaceName
+    if place is None or place == PLACE_UNKNOWN:
+        fields["placeSince"] = None
+    elif previous is None or previous.placeSince is None:
+        fields["placeSince"] = pet.currStartTime or now
+    elif previous.currPlaceName != place:
+        fields["placeSince"] = now
+    return fields
@@ -0,0 +1,95 @@
+"""Collar light palettes and the colour matching behind the light entity."""
+import functools
+from array import array
+
+# Colour code the collar falls back to, white
+DEFAULT_LED_COLOR_CODE = 8
+# Bits kept per RGB channel in the lookup table, 2 ** 15 cells
+LUT_BITS = 5
+_LUT_SHIFT = 8 - LUT_BITS
+_UNKNOWN = 255
+
+
+@functools.lru_cache(maxsize=64)
+def hex_to_rgb(hex_color):
+    """Return the (red, green, blue) tuple of a "#RRGGBB" or "RRGGBB" colour."""
+    hex_color = hex_color.lstrip("#")
+    return tuple(int(hex_color[i : i + 2], 16) for i in (0, 2, 4))
+
+
+def _linear(channel):
+    channel /= 255
+    if channel <= 0.04045:
+        return channel / 12.92
+    return ((channel + 0.055) / 1.055) ** 2.4
+
+
+def _labF(t):
+    if t > 216 / 24389:
+        return t ** (1 / 3)
+    return (24389 / 27 * t + 16) / 116
+
+
+def rgb_to_lab(rgb):
+    """Return the CIE L*a*b* coordinates of an sRGB colour, D65 white."""
+    r, g, b = (_linear(channel) for channel in rgb)
+    x = _labF((0.4124 * r + 0.3576 * g + 0.1805 * b) / 0.95047)
+    y = _labF(0.2126 * r + 0.7152 * g + 0.0722 * b)
+    z = _labF((0.0193 * r + 0.1192 * g + 0.9505 * b) / 1.08883)
+    return 116 * y - 16, 500 * (x - y), 200 * (y - z)
+
+
+class TryFiLedPalette:
+    """The colours one collar model can show, shared by every light using it.
+
+    Requested colours are matched to the perceptually closest palette colour
+    in L*a*b* space. Matches are memoized in a lookup table over RGB
+    quantized to LUT_BITS per channel, filled as colours are requested, so a
+    match is one array read once its cell has been seen.
+    """
+
+    __slots__ = ("_codes", "_colors", "_labs", "_lut")
+
+    def __init__(self, availableLedColors):
+        self._codes = tuple(color.ledColorCode for color in availableLedColors)
+        self._colors = {
+            color.ledColorCode: hex_to_rgb(color.hexCode)
+            for color in availableLedColors
+        }
+        self._labs = tuple(rgb_to_lab(self._colors[code]) for code in self._codes)
+        self._lut = array("B", [_UNKNOWN]) * (1 << 3 * LUT_BITS)
+
+    def rgb(self, colorCode):
+        return self._colors[colorCode]
+
+    def closestCode(self, rgb):
+        """Return the code of the palette colour closest to an RGB colour."""
+        if not self._codes:
+            return DEFAULT_LED_COLOR_CODE
+        r, g, b = (int(channel) >> _LUT_SHIFT for channel in rgb)
+        cell = (r << LUT_BITS | g) << LUT_BITS | b
+        index = self._lut[cell]
+        if index == _UNKNOWN:
+            index = self._lut[cell] = self._closestIndex(
+                # The centre of the cell stands for all of it
+                tuple(
+                    (channel << _LUT_SHIFT) + (1 << _LUT_SHIFT >> 1)
+                    for channel in (r, g, b)
+                )
+            )
+        return self._codes[index]
+
+    def _closestIndex(self, rgb):
+        l, a, b = rgb_to_lab(rgb)
+        return min(
+            range(len(self._labs)),
+            key=lambda i: (self._labs[i][0] - l) ** 2
+            + (self._labs[i][1] - a) ** 2
+            + (self._labs[i][2] - b) ** 2,
+        )
+
+
+@functools.lru_cache(maxsize=16)
+def ledPalette(availableLedColors):
+    """Return the palette of a tuple of LedColor, one instance per distinct set."""
+    return TryFiLedPalette(availableLedColors)
@@ -0,0 +1,198 @@
+"""Backoff and circuit breaking of the requests sent to TryFi."""
+import logging
+import random
+import time
+from datetime import timezone
+from email.utils import parsedate_to_datetime
+
+from homeassistant.util import dt as dt_util
+
+from .const import (
+    BACKOFF_MAX,
+    CIRCUIT_CLOSED,
+    CIRCUIT_COOLDOWN,
+    CIRCUIT_FAILURE_THRESHOLD,
+    CIRCUIT_HALF_OPEN,
+    CIRCUIT_OPEN,
+    UNIT_BACKOFF_BASE,
+)
+
+LOGGER = logging.getLogger(__name__)
+
+
+def backoffDelay(failures, base, ceiling=BACKOFF_MAX):
+    """Return the delay before retrying after a number of consecutive failures.
+
+    The delay doubles with every failure up to the ceiling and is jittered
+    between half and all of that, so retries from several tiers or accounts
+    spread out but never come back immediately.
+    """
+    delay = min(ceiling, base * 2 ** max(failures - 1, 0))
+    return random.uniform(delay / 2, delay)
+
+
+def parseRetryAfter(value, now=None):
+    """Return the seconds a Retry-After header asks to wait, None if unusable."""
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        retryAt = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retryAt.tzinfo is None:
+        retryAt = retryAt.replace(tzinfo=timezone.utc)
+    return max((retryAt - (now or dt_util.utcnow())).total_seconds(), 0.0)
+
+
+class TryFiUnitBackoff:
+    """Consecutive failures of the pets or bases of one tier.
+
+    A unit whose part of a refresh failed keeps its last good data and is
+    fetched on its own once its delay, which grows with its failures, has
+    passed. The other units are not held back.
+    """
+
+    def __init__(
+        self, base=UNIT_BACKOFF_BASE, ceiling=BACKOFF_MAX, clock=time.monotonic
+    ):
+        self._base = base
+        self._ceiling = ceiling
+        self._clock = clock
+        # key -> (consecutive failures, monotonic time of the next retry)
+        self._failures = {}
+
+    @property
+    def failing(self):
+        return frozenset(self._failures)
+
+    def canRetry(self, key):
+        failure = self._failures.get(key)
+        return failure is None or self._clock() >= failure[1]
+
+    def recordSuccess(self, key):
+        if self._failures.pop(key, None) is not None:
+            LOGGER.debug(f"TryFi {key} is refreshing again")
+
+    def recordFailure(self, key):
+        failures = self._failures.get(key, (0, 0.0))[0] + 1
+        delay = backoffDelay(failures, self._base, self._ceiling)
+        self._failures[key] = (failures, self._clock() + delay)
+
+    def retain(self, keys):
+        """Forget the units that are no longer part of the account."""
+        for key in self._failures.keys() - set(keys):
+            del self._failures[key]
+
+    def asDict(self):
+        now = self._clock()
+        return {
+            key: {
+                "consecutive_failures": failures,
+                "retry_in": max(retryAt - now, 0.0),
+            }
+            for key, (failures, retryAt) in self._failures.items()
+        }
+
+
+class TryFiCircuitBreaker:
+    """Stops sending requests to TryFi while it keeps failing.
+
+    Closed, requests flow. After CIRCUIT_FAILURE_THRESHOLD consecutive
+    failures, or as soon as TryFi asks to retry later, the circuit opens and
+    requests fail fast without touching the network. Once the open period
+    has passed it is half-open: a single probe request goes through, and its
+    outcome closes the circuit or opens it again for twice as long.
+    """
+
+    def __init__(
+        self,
+        threshold=CIRCUIT_FAILURE_THRESHOLD,
+        cooldown=CIRCUIT_COOLDOWN,
+        ceiling=BACKOFF_MAX,
+        clock=time.monotonic,
+    ):
+        self._threshold = threshold
+        self._cooldown = cooldown
+        self._ceiling = ceiling
+        self._clock = clock
+        self._state = CIRCUIT_CLOSED
+        self._failures = 0
+        self._opens = 0
+        self._openUntil = 0.0
+        self._probing = False
+        self._rejected = 0
+
+    @property
+    def state(self):
+        return self._state
+
+    @property
+    def failures(self):
+        return self._failures
+
+    @property
+    def retryIn(self):
+        """Seconds until the circuit lets a probe through, 0 when closed."""
+        if self._state == CIRCUIT_CLOSED:
+            return 0.0
+        return max(self._openUntil - self._clock(), 0.0)
+
+    def allowRequest(self):
+        if self._state == CIRCUIT_OPEN and self._clock() >= self._openUntil:
+            self._state = CIRCUIT_HALF_OPEN
+        if self._state == CIRCUIT_HALF_OPEN and not self._probing:
+            self._probing = True
+            return True
+        if self._state == CIRCUIT_CLOSED:
+            return True
+        self._rejected += 1
+        return False
+
+    def releaseProbe(self):
+        """Let another request probe when the probe was cancelled."""
+        self._probing = False
+
+    def recordSuccess(self):
+        if self._state != CIRCUIT_CLOSED:
+            LOGGER.info("TryFi is answering again, resuming requests")
+        self._state = CIRCUIT_CLOSED
+        self._failures = 0
+        self._opens = 0
+        self._probing = False
+
+    def recordFailure(self, retryAfter=None):
+        self._failures += 1
+        self._probing = False
+        if (
+            self._state == CIRCUIT_HALF_OPEN
+            or self._failures >= self._threshold
+            or retryAfter is not None
+        ):
+            self._open(retryAfter)
+
+    def _open(self, retryAfter):
+        self._opens += 1
+        cooldown = backoffDelay(self._opens, self._cooldown, self._ceiling)
+        if retryAfter is not None:
+            cooldown = max(cooldown, retryAfter)
+        if self._state == CIRCUIT_CLOSED:
+            LOGGER.warning(
+                f"TryFi requests keep failing, pausing them for {cooldown:.0f} seconds"
+            )
+        else:
+            LOGGER.debug(f"TryFi still failing, pausing requests for {cooldown:.0f} seconds")
+        self._state = CIRCUIT_OPEN
+        self._openUntil = self._clock() + cooldown
+
+    def asDict(self):
+        return {
+            "state": self._state,
+            "consecutive_failures": self._failures,
+            "opens": self._opens,
+            "retry_in": self.retryIn,
+            "rejected_requests": self._rejected,
+        }
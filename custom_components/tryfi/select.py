@@ -1,26 +1,35 @@
 from homeassistant.components.select import SelectEntity
-from homeassistant.helpers.update_coordinator import CoordinatorEntity
+from homeassistant.core import callback
 
-from .const import DOMAIN
+from . import async_track_household, fieldContext
+from .const import DOMAIN, TIER_DEVICE, TIER_LOCATION
+from .entity import TryFiEntity
 
 async def async_setup_entry(hass, config_entry, async_add_devices):
     """Add sensors for passed config_entry in HA."""
-    coordinator = hass.data[DOMAIN][config_entry.entry_id]
+    tryfiData = hass.data[DOMAIN][config_entry.entry_id]
+    coordinator = tryfiData.coordinator(TIER_DEVICE)
+    location = tryfiData.coordinator(TIER_LOCATION)
 
-    tryfi = coordinator.data
+    @callback
+    def async_add_pets(pets):
+        new_devices = []
+        for pet in pets:
+            new_devices.append(TryFiLostMode(hass, pet, coordinator, location))
+        if new_devices:
+            async_add_devices(new_devices)
 
-    new_devices = []
-    for pet in tryfi.pets:
-        new_devices.append(TryFiLostMode(hass, pet, coordinator))
-    if new_devices:
-        async_add_devices(new_devices)
+    async_track_household(hass, config_entry, async_add_pets)
 
 
-class TryFiLostMode(CoordinatorEntity, SelectEntity):
-    def __init__(self, hass, pet, coordinator):
+class TryFiLostMode(TryFiEntity, SelectEntity):
+    def __init__(self, hass, pet, coordinator, location):
         self._petId = pet.petId
         self._hass = hass
-        super().__init__(coordinator)
+        self._location = location
+        # Option selected but not confirmed by TryFi yet
+        self._pendingOption = None
+        super().__init__(coordinator, fieldContext(self._petId, "name", "mode"))
 
     @property
     def name(self):
@@ -36,7 +45,7 @@ class TryFiLostMode(CoordinatorEntity, SelectEntity):
 
     @property
     def tryfi(self):
-        return self.coordinator.data
+        return self.coordinator.tryfi
 
     @property
     def unique_id(self):
@@ -52,6 +61,8 @@ class TryFiLostMode(CoordinatorEntity, SelectEntity):
 
     @property
     def current_option(self):
+        if self._pendingOption is not None:
+            return self._pendingOption
         if self.pet.isLost:
             return 'Lost'
         else:
@@ -64,8 +75,17 @@ class TryFiLostMode(CoordinatorEntity, SelectEntity):
             "name": self.pet.name,
             "manufacturer": "TryFi",
             "model": self.pet.breed,
-            "sw_version": self.pet.device.buildId,
+            "sw_version": self.pet.buildId,
         }
     
-    def select_option(self, option):
-        self.pet.setLostDogMode(self.tryfi.session, option == 'Lost')
+    async def async_select_option(self, option):
+        self._pendingOption = option
+        self.async_write_ha_state()
+        try:
+            await self.tryfi.async_set_lost_dog_mode(self.pet, option == 'Lost')
+        finally:
+            self._pendingOption = None
+            self.coordinator.async_publish()
+            self.async_write_ha_state()
+            # Starts or stops the fast location polling of this pet
+            self._location.async_sync_bursts()
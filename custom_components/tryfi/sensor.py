@@ -1,17 +1,28 @@
 """Platform for sensor integration."""
 import logging
-
-from homeassistant.components.sensor import SensorDeviceClass
+from collections.abc import Callable
+from dataclasses import dataclass
+from operator import attrgetter
+
+from homeassistant.components.sensor import (
+    SensorDeviceClass,
+    SensorEntity,
+    SensorEntityDescription,
+    SensorStateClass,
+)
 from homeassistant.const import (
     PERCENTAGE,
     STATE_OK,
     STATE_PROBLEM,
+    UnitOfInformation,
     UnitOfLength,
+    UnitOfSpeed,
     UnitOfTime
 )
 from homeassistant.core import callback
+from homeassistant.helpers.device_registry import DeviceEntryType
 from homeassistant.helpers.dispatcher import async_dispatcher_connect, dispatcher_send
-from homeassistant.helpers.entity import Entity
+from homeassistant.helpers.entity import Entity, EntityCategory
 from homeassistant.helpers.icon import icon_for_battery_level
 from homeassistant.helpers.update_coordinator import (
     CoordinatorEntity,
@@ -19,48 +30,288 @@ from homeassistant.helpers.update_coordinator import (
     UpdateFailed,
 )
 
-from .const import DOMAIN, SENSOR_STATS_BY_TIME, SENSOR_STATS_BY_TYPE
+from . import async_track_household, fieldContext
+from .const import (
+    DOMAIN,
+    SENSOR_STATS_BY_TIME,
+    SENSOR_STATS_BY_TYPE,
+    TIER_BASES,
+    TIER_DEVICE,
+    TIER_LOCATION,
+    TIER_STATS,
+    TIERS,
+)
+from .entity import TryFiEntity
 
 LOGGER = logging.getLogger(__name__)
 
 
+@dataclass
+class TryFiPetSensorRequiredKeysMixin:
+    """Mixin for required keys."""
+
+    tier: str
+    fields: tuple
+    value_fn: Callable
+
+
+@dataclass
+class TryFiPetSensorEntityDescription(
+    SensorEntityDescription, TryFiPetSensorRequiredKeysMixin
+):
+    """Describes a pet sensor: the key is the unique id suffix, the name is
+    appended to the pet name and value_fn reads the state from the pet."""
+
+    icon_fn: Callable | None = None
+
+
+# Pet field suffix, divisor, unit and device class of each stat type
+STAT_TYPE_DETAILS = {
+    "STEPS": ("Steps", None, "steps", None),
+    "DISTANCE": (
+        "TotalDistance",
+        1000,
+        UnitOfLength.KILOMETERS,
+        SensorDeviceClass.DISTANCE,
+    ),
+    "SLEEP": ("Sleep", 60, UnitOfTime.MINUTES, SensorDeviceClass.DURATION),
+    "NAP": ("Nap", 60, UnitOfTime.MINUTES, SensorDeviceClass.DURATION),
+}
+
+
+def _statValueFn(field, divisor):
+    getter = attrgetter(field)
+    if divisor is None:
+        return getter
+    # Windows that are not fetched have no value
+    return lambda pet: None if getter(pet) is None else round(getter(pet) / divisor, 2)
+
+
+def _statDescriptions():
+    for statType in SENSOR_STATS_BY_TYPE:
+        fieldSuffix, divisor, unit, deviceClass = STAT_TYPE_DETAILS[statType]
+        for statTime in SENSOR_STATS_BY_TIME:
+            field = statTime.lower() + fieldSuffix
+            yield TryFiPetSensorEntityDescription(
+                key=f"{statTime.lower()}-{statType.lower()}",
+                name=f"{statTime.title()} {statType.title()}",
+                tier=TIER_STATS,
+                fields=(field,),
+                value_fn=_statValueFn(field, divisor),
+                native_unit_of_measurement=unit,
+                device_class=deviceClass,
+                # Totals only grow within a window; the drop at rollover is
+                # recorded as a meter reset by long-term statistics.
+                state_class=SensorStateClass.TOTAL_INCREASING,
+                icon="mdi:map-marker-distance",
+            )
+
+
+# Built once at import, each description carries everything a state read needs
+PET_SENSOR_DESCRIPTIONS = (
+    TryFiPetSensorEntityDescription(
+        key="battery",
+        name="Collar Battery Level",
+        tier=TIER_DEVICE,
+        fields=("batteryPercent", "isCharging"),
+        value_fn=lambda pet: pet.batteryPercent,
+        icon_fn=lambda pet: icon_for_battery_level(
+            battery_level=pet.batteryPercent,
+            charging=bool(pet.isCharging),
+        ),
+        native_unit_of_measurement=PERCENTAGE,
+        device_class=SensorDeviceClass.BATTERY,
+        state_class=SensorStateClass.MEASUREMENT,
+    ),
+    *_statDescriptions(),
+    TryFiPetSensorEntityDescription(
+        key="activity-type",
+        name="Activity Type",
+        tier=TIER_LOCATION,
+        fields=("activityType",),
+        value_fn=attrgetter("activityType"),
+        icon="mdi:run",
+    ),
+    TryFiPetSensorEntityDescription(
+        key="current-place-name",
+        name="Current Place Name",
+        tier=TIER_LOCATION,
+        fields=("currPlaceName",),
+        value_fn=attrgetter("currPlaceName"),
+        icon="mdi:earth",
+    ),
+    TryFiPetSensorEntityDescription(
+        key="current-place-address",
+        name="Current Place Address",
+        tier=TIER_LOCATION,
+        fields=("currPlaceAddress",),
+        value_fn=attrgetter("currPlaceAddress"),
+        icon="mdi:map-marker",
+    ),
+    TryFiPetSensorEntityDescription(
+        key="connected-to",
+        name="Connected To",
+        tier=TIER_LOCATION,
+        fields=("connectionStateType",),
+        value_fn=lambda pet: pet.connectionStateType,
+        icon="mdi:human-greeting-proximity",
+    ),
+    TryFiPetSensorEntityDescription(
+        key="speed",
+        name="Speed",
+        tier=TIER_LOCATION,
+        fields=("speed",),
+        value_fn=attrgetter("speed"),
+        native_unit_of_measurement=UnitOfSpeed.KILOMETERS_PER_HOUR,
+        device_class=SensorDeviceClass.SPEED,
+        state_class=SensorStateClass.MEASUREMENT,
+        icon="mdi:speedometer",
+    ),
+    TryFiPetSensorEntityDescription(
+        key="home-distance",
+        name="Distance From Home",
+        tier=TIER_LOCATION,
+        fields=("homeDistance",),
+        value_fn=attrgetter("homeDistance"),
+        native_unit_of_measurement=UnitOfLength.METERS,
+        device_class=SensorDeviceClass.DISTANCE,
+        state_class=SensorStateClass.MEASUREMENT,
+        icon="mdi:home-map-marker",
+    ),
+    TryFiPetSensorEntityDescription(
+        key="place-since",
+        name="At Place Since",
+        tier=TIER_LOCATION,
+        fields=("placeSince",),
+        value_fn=attrgetter("placeSince"),
+        device_class=SensorDeviceClass.TIMESTAMP,
+        icon="mdi:map-clock",
+    ),
+)
+
+
+@dataclass
+class TryFiMetricSensorRequiredKeysMixin:
+    """Mixin for required keys."""
+
+    value_fn: Callable
+
+
+@dataclass
+class TryFiMetricSensorEntityDescription(
+    SensorEntityDescription, TryFiMetricSensorRequiredKeysMixin
+):
+    """Describes a diagnostic sensor reading the refresh metrics of a tier."""
+
+
+def _milliseconds(seconds):
+    return None if seconds is None else round(seconds * 1000, 1)
+
+
+METRIC_SENSOR_DESCRIPTIONS = (
+    TryFiMetricSensorEntityDescription(
+        key="refresh-duration",
+        name="Refresh Duration",
+        value_fn=lambda metrics: _milliseconds(metrics.lastDuration),
+        native_unit_of_measurement=UnitOfTime.MILLISECONDS,
+        device_class=SensorDeviceClass.DURATION,
+        state_class=SensorStateClass.MEASUREMENT,
+        icon="mdi:timer-outline",
+        entity_registry_enabled_default=False,
+    ),
+    TryFiMetricSensorEntityDescription(
+        key="api-calls",
+        name="API Calls",
+        value_fn=attrgetter("lastCalls"),
+        state_class=SensorStateClass.MEASUREMENT,
+        icon="mdi:api",
+        entity_registry_enabled_default=False,
+    ),
+    TryFiMetricSensorEntityDescription(
+        key="bytes-received",
+        name="Bytes Received",
+        value_fn=attrgetter("lastBytesReceived"),
+        native_unit_of_measurement=UnitOfInformation.BYTES,
+        device_class=SensorDeviceClass.DATA_SIZE,
+        state_class=SensorStateClass.MEASUREMENT,
+        entity_registry_enabled_default=False,
+    ),
+    TryFiMetricSensorEntityDescription(
+        key="parse-time",
+        name="Parse Time",
+        value_fn=lambda metrics: _milliseconds(metrics.lastParseTime),
+        native_unit_of_measurement=UnitOfTime.MILLISECONDS,
+        device_class=SensorDeviceClass.DURATION,
+        state_class=SensorStateClass.MEASUREMENT,
+        icon="mdi:code-json",
+        entity_registry_enabled_default=False,
+    ),
+    TryFiMetricSensorEntityDescription(
+        key="consecutive-failures",
+        name="Consecutive Failures",
+        value_fn=attrgetter("consecutiveFailures"),
+        state_class=SensorStateClass.MEASUREMENT,
+        icon="mdi:alert-circle-outline",
+    ),
+    TryFiMetricSensorEntityDescription(
+        key="last-success",
+        name="Last Successful Update",
+        value_fn=attrgetter("lastSuccess"),
+        device_class=SensorDeviceClass.TIMESTAMP,
+        entity_registry_enabled_default=False,
+    ),
+)
+
+
 async def async_setup_entry(hass, config_entry, async_add_devices):
     """Add sensors for passed config_entry in HA."""
-    coordinator = hass.data[DOMAIN][config_entry.entry_id]
+    tryfiData = hass.data[DOMAIN][config_entry.entry_id]
+    basesCoordinator = tryfiData.coordinator(TIER_BASES)
+
+    @callback
+    def async_add_pets(pets):
+        new_devices = []
+        for pet in pets:
+            LOGGER.debug(f"Adding Pet Sensors: {pet}")
+            for description in PET_SENSOR_DESCRIPTIONS:
+                new_devices.append(
+                    TryFiPetSensor(
+                        hass, pet, tryfiData.coordinator(description.tier), description
+                    )
+                )
+        if new_devices:
+            async_add_devices(new_devices)
+
+    @callback
+    def async_add_bases(bases):
+        new_devices = []
+        for base in bases:
+            LOGGER.debug(f"Adding Base: {base}")
+            new_devices.append(TryFiBaseSensor(hass, base, basesCoordinator))
+        if new_devices:
+            async_add_devices(new_devices)
 
-    tryfi = coordinator.data
+    async_track_household(hass, config_entry, async_add_pets, async_add_bases)
 
     new_devices = []
-    for pet in tryfi.pets:
-        LOGGER.debug(f"Adding Pet Battery Sensor: {pet}")
-        new_devices.append(TryFiBatterySensor(hass, pet, coordinator))
-        for statType in SENSOR_STATS_BY_TYPE:
-            for statTime in SENSOR_STATS_BY_TIME:
-                LOGGER.debug(f"Adding Pet Stat: {pet}")
-                new_devices.append(
-                    PetStatsSensor(hass, pet, coordinator, statType, statTime)
+    for tier in TIERS:
+        for description in METRIC_SENSOR_DESCRIPTIONS:
+            new_devices.append(
+                TryFiMetricSensor(
+                    config_entry, tryfiData.coordinator(tier), description
                 )
-        LOGGER.debug(f"Adding Pet Generic Sensor: {pet}")
-        new_devices.append(PetGenericSensor(hass, pet, coordinator, "Activity Type"))
-        new_devices.append(PetGenericSensor(hass, pet, coordinator, "Current Place Name"))
-        new_devices.append(PetGenericSensor(hass, pet, coordinator, "Current Place Address"))
-        new_devices.append(PetGenericSensor(hass, pet, coordinator, "Connected To"))
-        
-
-    for base in tryfi.bases:
-        LOGGER.debug(f"Adding Base: {base}")
-        new_devices.append(TryFiBaseSensor(hass, base, coordinator))
+            )
     if new_devices:
         async_add_devices(new_devices)
 
 
-class TryFiBaseSensor(CoordinatorEntity, Entity):
+class TryFiBaseSensor(TryFiEntity, Entity):
     def __init__(self, hass, base, coordinator):
         self._hass = hass
         self._baseId = base.baseId
         self._online = base.online
         self._base = base
-        super().__init__(coordinator)
+        super().__init__(coordinator, fieldContext(self._baseId, "name", "online"))
 
     @property
     def name(self):
@@ -107,36 +358,31 @@ class TryFiBaseSensor(CoordinatorEntity, Entity):
             "name": self.base.name,
             "manufacturer": "TryFi",
             "model": "TryFi Base",
-            # "sw_version": self.pet.device.buildId,
+            # "sw_version": self.pet.buildId,
         }
 
-class PetGenericSensor(CoordinatorEntity, Entity):
-    """Representation of a Sensor."""
+class TryFiPetSensor(TryFiEntity, SensorEntity):
+    """Representation of a pet sensor described by a TryFiPetSensorEntityDescription."""
+
+    entity_description: TryFiPetSensorEntityDescription
 
-    def __init__(self, hass, pet, coordinator, statType):
+    def __init__(self, hass, pet, coordinator, description):
         self._hass = hass
         self._petId = pet.petId
-        self._statType = statType
-        super().__init__(coordinator)
-    
-    @property
-    def statType(self):
-        return self._statType
-
-    @property
-    def statTime(self):
-        return self._statTime
+        self.entity_description = description
+        super().__init__(
+            coordinator, fieldContext(self._petId, "name", *description.fields)
+        )
 
     @property
     def name(self):
         """Return the name of the sensor."""
-        return f"{self.pet.name} {self.statType.title()}"
+        return f"{self.pet.name} {self.entity_description.name}"
 
     @property
     def unique_id(self):
         """Return the ID of this sensor."""
-        formattedType = self.statType.lower().replace(" ", "-")
-        return f"{self.pet.petId}-{formattedType}"
+        return f"{self.petId}-{self.entity_description.key}"
 
     @property
     def petId(self):
@@ -146,43 +392,19 @@ class PetGenericSensor(CoordinatorEntity, Entity):
     def pet(self):
         return self.coordinator.data.getPet(self.petId)
 
-    @property
-    def device(self):
-        return self.pet.device
-
     @property
     def device_id(self):
         return self.unique_id
 
-    @property
-    def device_class(self):
-        """Return the device class of the sensor."""
-        return None
-
     @property
     def icon(self):
-        if self.statType == "Activity Type":
-            return "mdi:run"
-        elif self.statType == "Current Place Name":
-            return "mdi:earth"
-        elif self.statType == "Current Place Address":
-            return "mdi:map-marker"
-        elif self.statType == "Connected To":
-            return "mdi:human-greeting-proximity"
+        if self.entity_description.icon_fn is not None:
+            return self.entity_description.icon_fn(self.pet)
+        return self.entity_description.icon
 
     @property
-    def state(self):
-        if self.statType == "Activity Type":
-            return self.pet.getActivityType()
-        elif self.statType == "Current Place Name":
-            return self.pet.getCurrPlaceName()
-        elif self.statType == "Current Place Address":
-            return self.pet.getCurrPlaceAddress()
-        elif self.statType == "Connected To":
-            return self.pet.device.connectionStateType
-    @property
-    def unit_of_measurement(self):
-        return None
+    def native_value(self):
+        return self.entity_description.value_fn(self.pet)
 
     @property
     def device_info(self):
@@ -191,188 +413,56 @@ class PetGenericSensor(CoordinatorEntity, Entity):
             "name": self.pet.name,
             "manufacturer": "TryFi",
             "model": self.pet.breed,
-            "sw_version": self.pet.device.buildId,
+            "sw_version": self.pet.buildId,
         }
 
-class PetStatsSensor(CoordinatorEntity, Entity):
-    """Representation of a Sensor."""
-
-    def __init__(self, hass, pet, coordinator, statType, statTime):
-        self._hass = hass
-        self._petId = pet.petId
-        self._statType = statType
-        self._statTime = statTime
-        super().__init__(coordinator)
-
-    @property
-    def statType(self):
-        return self._statType
-
-    @property
-    def statTime(self):
-        return self._statTime
-
-    @property
-    def name(self):
-        """Return the name of the sensor."""
-        return f"{self.pet.name} {self.statTime.title()} {self.statType.title()}"
-
-    @property
-    def unique_id(self):
-        """Return the ID of this sensor."""
-        return f"{self.pet.petId}-{self.statTime.lower()}-{self.statType.lower()}"
-
-    @property
-    def petId(self):
-        return self._petId
 
-    @property
-    def pet(self):
-        return self.coordinator.data.getPet(self.petId)
+class TryFiMetricSensor(CoordinatorEntity, SensorEntity):
+    """Diagnostic sensor exposing the refresh metrics of one tier.
 
-    @property
-    def device(self):
-        return self.pet.device
+    It is written after every refresh of its tier and stays available when
+    the refresh fails, which is when the metrics matter most.
+    """
 
-    @property
-    def device_id(self):
-        return self.unique_id
+    entity_description: TryFiMetricSensorEntityDescription
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
 
-    @property
-    def device_class(self):
-        """Return the device class of the sensor."""
-        return None
-
-    @property
-    def icon(self):
-        return "mdi:map-marker-distance"
-
-    @property
-    def state(self):
-        if self.statType.upper() == "STEPS":
-            if self.statTime.upper() == "DAILY":
-                return self.pet.dailySteps
-            elif self.statTime.upper() == "WEEKLY":
-                return self.pet.weeklySteps
-            elif self.statTime.upper() == "MONTHLY":
-                return self.pet.monthlySteps
-        elif self.statType.upper() == "DISTANCE":
-            if self.statTime.upper() == "DAILY":
-                return round(self.pet.dailyTotalDistance / 1000, 2)
-            elif self.statTime.upper() == "WEEKLY":
-                return round(self.pet.weeklyTotalDistance / 1000, 2)
-            elif self.statTime.upper() == "MONTHLY":
-                return round(self.pet.monthlyTotalDistance / 1000, 2)
-        elif self.statType.upper() == "NAP":
-            if self.statTime.upper() == "DAILY":
-                return round(self.pet.dailyNap / 60, 2)
-            elif self.statTime.upper() == "WEEKLY":
-                return round(self.pet.weeklyNap / 60, 2)
-            elif self.statTime.upper() == "MONTHLY":
-                return round(self.pet.monthlyNap / 60, 2)
-        elif self.statType.upper() == "SLEEP":
-            if self.statTime.upper() == "DAILY":
-                return round(self.pet.dailySleep / 60, 2)
-            elif self.statTime.upper() == "WEEKLY":
-                return round(self.pet.weeklySleep / 60, 2)
-            elif self.statTime.upper() == "MONTHLY":
-                return round(self.pet.monthlySleep / 60, 2)
-        else:
-            return None
-
-    @property
-    def unit_of_measurement(self):
-        """Return the unit_of_measurement of the device."""
-        if self.statType.upper() == "DISTANCE":
-            return UnitOfLength.KILOMETERS
-        elif self.statType.upper() == "SLEEP":
-            return UnitOfTime.MINUTES
-        elif self.statType.upper() == "NAP":
-            return UnitOfTime.MINUTES
-        else:
-            return "steps"
-
-    @property
-    def device_info(self):
-        return {
-            "identifiers": {(DOMAIN, self.pet.petId)},
-            "name": self.pet.name,
-            "manufacturer": "TryFi",
-            "model": self.pet.breed,
-            "sw_version": self.pet.device.buildId,
-        }
-
-
-class TryFiBatterySensor(CoordinatorEntity, Entity):
-    """Representation of a Sensor."""
-
-    def __init__(self, hass, pet, coordinator):
-        self._hass = hass
-        self._petId = pet.petId
+    def __init__(self, config_entry, coordinator, description):
+        self._entryId = config_entry.entry_id
+        self._title = config_entry.title
+        self.entity_description = description
         super().__init__(coordinator)
 
     @property
     def name(self):
         """Return the name of the sensor."""
-        return f"{self.pet.name} Collar Battery Level"
+        return f"TryFi {self.coordinator.tier.title()} {self.entity_description.name}"
 
     @property
     def unique_id(self):
         """Return the ID of this sensor."""
-        return f"{self.pet.petId}-battery"
+        return f"{self._entryId}-{self.coordinator.tier}-{self.entity_description.key}"
 
-    @property
-    def petId(self):
-        return self._petId
-
-    @property
-    def pet(self):
-        return self.coordinator.data.getPet(self.petId)
-
-    @property
-    def device(self):
-        return self.pet.device
-
-    @property
-    def device_id(self):
-        return self.unique_id
-
-    @property
-    def device_class(self):
-        """Return the device class of the sensor."""
-        return SensorDeviceClass.BATTERY
-
-    @property
-    def unit_of_measurement(self):
-        """Return the unit_of_measurement of the device."""
-        return PERCENTAGE
-
-    @property
-    def isCharging(self):
-        return bool(self.pet.device.isCharging)
-
-    @property
-    def icon(self):
-        """Return the icon for the battery."""
-        return icon_for_battery_level(
-            battery_level=self.batteryPercent, charging=self.isCharging
+    async def async_added_to_hass(self):
+        await super().async_added_to_hass()
+        self.async_on_remove(
+            self.coordinator.async_add_metrics_listener(self.async_write_ha_state)
         )
 
     @property
-    def batteryPercent(self):
-        """Return the state of the sensor."""
-        return self.pet.device.batteryPercent
+    def available(self):
+        return True
 
     @property
-    def state(self):
-        return self.batteryPercent
+    def native_value(self):
+        return self.entity_description.value_fn(self.coordinator.metrics)
 
     @property
     def device_info(self):
         return {
-            "identifiers": {(DOMAIN, self.pet.petId)},
-            "name": self.pet.name,
+            "identifiers": {(DOMAIN, self._entryId)},
+            "name": f"TryFi {self._title}",
             "manufacturer": "TryFi",
-            "model": self.pet.breed,
-            "sw_version": self.pet.device.buildId,
+            "model": "TryFi Account",
+            "entry_type": DeviceEntryType.SERVICE,
         }
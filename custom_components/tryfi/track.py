@@ -0,0 +1,111 @@
+"""Recent GPS fixes of the pets, kept in memory."""
+from array import array
+
+from .const import TRACK_CAPACITY
+
+# Stored in place of a missing accuracy, real ones are never negative
+UNKNOWN_ACCURACY = -1.0
+
+
+class TryFiTrack:
+    """Fixed-size ring buffer of a pet's GPS fixes.
+
+    Fixes are stored as (timestamp, latitude, longitude, accuracy) in four
+    preallocated arrays of doubles, so the buffer takes capacity * 32 bytes
+    whatever it holds and an append is O(1). Once full, the oldest fix is
+    overwritten. A fix equal to the last one, or older than it, is dropped so
+    the timestamps stay sorted and a pet sleeping at home does not flush its
+    walk out of the buffer.
+    """
+
+    __slots__ = (
+        "_capacity",
+        "_times",
+        "_latitudes",
+        "_longitudes",
+        "_accuracies",
+        "_start",
+        "_size",
+    )
+
+    def __init__(self, capacity=TRACK_CAPACITY):
+        self._capacity = capacity
+        self._times = array("d", bytes(8 * capacity))
+        self._latitudes = array("d", bytes(8 * capacity))
+        self._longitudes = array("d", bytes(8 * capacity))
+        self._accuracies = array("d", bytes(8 * capacity))
+        self._start = 0
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    @property
+    def capacity(self):
+        return self._capacity
+
+    @property
+    def nbytes(self):
+        return 4 * self._capacity * self._times.itemsize
+
+    def _index(self, position):
+        return (self._start + position) % self._capacity
+
+    def append(self, timestamp, latitude, longitude, accuracy=None):
+        """Add a fix, return False when it was dropped."""
+        accuracy = UNKNOWN_ACCURACY if accuracy is None else accuracy
+        if self._size:
+            last = self._index(self._size - 1)
+            if timestamp < self._times[last] or (
+                latitude == self._latitudes[last]
+                and longitude == self._longitudes[last]
+                and accuracy == self._accuracies[last]
+            ):
+                return False
+
+        if self._size == self._capacity:
+            index = self._start
+            self._start = self._index(1)
+        else:
+            index = self._index(self._size)
+            self._size += 1
+        self._times[index] = timestamp
+        self._latitudes[index] = latitude
+        self._longitudes[index] = longitude
+        self._accuracies[index] = accuracy
+        return True
+
+    def last(self):
+        """Return the newest (timestamp, latitude, longitude) fix, if any."""
+        if not self._size:
+            return None
+        index = self._index(self._size - 1)
+        return self._times[index], self._latitudes[index], self._longitudes[index]
+
+    def _bisect(self, timestamp):
+        """Return the position of the first fix at or after timestamp."""
+        low, high = 0, self._size
+        while low < high:
+            middle = (low + high) // 2
+            if self._times[self._index(middle)] < timestamp:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def window(self, start=None, end=None):
+        """Yield the (timestamp, latitude, longitude, accuracy) fixes between
+        start and end, inclusive and oldest first."""
+        first = 0 if start is None else self._bisect(start)
+        for position in range(first, self._size):
+            index = self._index(position)
+            timestamp = self._times[index]
+            if end is not None and timestamp > end:
+                return
+            accuracy = self._accuracies[index]
+            yield (
+                timestamp,
+                self._latitudes[index],
+                self._longitudes[index],
+                None if accuracy == UNKNOWN_ACCURACY else accuracy,
+            )